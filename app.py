@@ -1,14 +1,24 @@
 # app.py
 import os
-import re
-import textwrap
-from io import BytesIO
+import time
+import uuid
 
 import streamlit as st
-from openai import OpenAI
-from docx import Document
-from docx.shared import Pt, Inches, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from coach.cache import ReviewCache
+from coach.jobs import JobQueue, QueueFull
+from coach.llm import make_llm_client
+from coach.markdown import SectionStream, parse_review
+from coach.metrics import MetricsLog, Trace, estimate_cost
+from coach.parser import parse_docx_to_payload
+from coach.prompts import count_tokens, guide_chunks, prefix_fingerprint, rubric_guide, workbook_guide
+from coach.report import build_docx, build_docx_from_markdown
+from coach.resilience import CallPolicy, ResilientClient
+from coach.revisions import RevisionStore, mark_revisions
+from coach.review import ReviewConfig, Usage, cache_key_for, repair_sections, run_fanout_review, run_review, stream_single_review
+from coach.sections import filled_block_count, list_empty_blocks
+from coach.similar import Match, SimilarityIndex
+from coach.validate import validate_review
 
 # ---------- App Config ----------
 st.set_page_config(page_title="Sinapis AI Coach – BMC Review", page_icon="🧭", layout="wide")
@@ -16,481 +26,390 @@ st.title("Sinapis AI Coach – Ascent BMC Review")
 st.markdown("Upload the **Word submission** and click **Run Review**. You’ll get a downloadable Word report.")
 
 # ---------- OpenAI (lazy client + firm timeout) ----------
+# One client per server process: its HTTP connection pool (keep-alive, TLS already negotiated)
+# is reused by every review instead of being rebuilt per request, and its circuit breaker and latency
+# history are shared by every session.
+# Each call retries 429/5xx/timeouts with jittered backoff within REVIEW_DEADLINE_S, falls back from
+# gpt-4o to gpt-4o-mini when the deadline left is too short (disable via Secrets: MODEL_FALLBACK="0"),
+# and can hedge slow calls with a second request (enable via Secrets: HEDGE_REVIEW="1").
+# LLM_BACKEND="mock" sends every call to a local stand-in instead (LLM_BASE_URL, default the
+# `python -m coach.stub_openai` port), "stub" answers in-process; see coach/llm.py.
+@st.cache_resource
 def get_client():
-    api_key = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
-    org_id  = st.secrets.get("OPENAI_ORG")     or os.getenv("OPENAI_ORG") or os.getenv("OPENAI_ORG_ID")
-    proj_id = st.secrets.get("OPENAI_PROJECT") or os.getenv("OPENAI_PROJECT")
-    if not api_key:
-        st.error("Missing OPENAI_API_KEY in Streamlit Secrets.")
-        st.stop()
-    os.environ["OPENAI_API_KEY"] = api_key
-    if org_id:  os.environ["OPENAI_ORG_ID"] = org_id
-    if proj_id: os.environ["OPENAI_PROJECT"] = proj_id
-    # Per-request timeout (seconds)
-    return OpenAI(timeout=60.0)
+    backend = os.getenv("LLM_BACKEND") or st.secrets.get("LLM_BACKEND") or "openai"
+    if backend == "openai":
+        api_key = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
+        org_id  = st.secrets.get("OPENAI_ORG")     or os.getenv("OPENAI_ORG") or os.getenv("OPENAI_ORG_ID")
+        proj_id = st.secrets.get("OPENAI_PROJECT") or os.getenv("OPENAI_PROJECT")
+        if not api_key:
+            st.error("Missing OPENAI_API_KEY in Streamlit Secrets.")
+            st.stop()
+        os.environ["OPENAI_API_KEY"] = api_key
+        if org_id:  os.environ["OPENAI_ORG_ID"] = org_id
+        if proj_id: os.environ["OPENAI_PROJECT"] = proj_id
+    policy = CallPolicy(
+        deadline_s=float(os.getenv("REVIEW_DEADLINE_S") or st.secrets.get("REVIEW_DEADLINE_S") or 180),
+        attempt_timeout_s=60.0,  # per HTTP attempt (seconds)
+        hedge=(os.getenv("HEDGE_REVIEW") or st.secrets.get("HEDGE_REVIEW")) == "1",
+        **({"fallback": {}} if (os.getenv("MODEL_FALLBACK") or st.secrets.get("MODEL_FALLBACK")) == "0" else {}),
+    )
+    base_url = os.getenv("LLM_BASE_URL") or st.secrets.get("LLM_BASE_URL")
+    return ResilientClient(make_llm_client(backend, base_url=base_url, timeout=60.0), policy)
 
 # Choose model automatically; set USE_GPT4O=1 in Secrets to use gpt-4o
 MODEL_NAME = "gpt-4o" if (os.getenv("USE_GPT4O") == "1" or st.secrets.get("USE_GPT4O") == "1") else "gpt-4o-mini"
 MAX_TOKENS = 7000 if MODEL_NAME == "gpt-4o" else 5000
 
-# ---------- Prompts ----------
-SINAPIS_COACH_SYS = textwrap.dedent("""
-You are **Sinapis AI Coach**, reviewing founder submissions using the Sinapis Ascent Business Model Canvas.
-Audience: post-revenue SMEs in frontier markets (Kenya first).
-Method: Osterwalder BMC + Lean Canvas emphasis + Sinapis Kingdom Impact lens.
-Tone: encouraging, direct critique; diagnostic + light prescriptive.
-NEVER invent content for missing blocks; mark “Missing/Needs input.”
-""").strip()
-
-MARKDOWN_INSTRUCTION = (
-    "Return the assessment as Markdown. "
-    "Use '##' for major sections (1) Problem … 14) Final Assessment). "
-    "Use '###' for subheadings (Strengths, Weaknesses, Probing Questions, Suggested Explorations; "
-    "and under Final Assessment: Quick Wins, Deeper Strategic Questions, Overall Cohesiveness). "
-    "Use bullet lists for items under each subheading. Do not use bold for subheadings."
-)
+# Fan-out mode: one concurrent request per canvas block, then a synthesis call for 13) + 14).
+# Enable via Secrets: FANOUT_REVIEW="1" (FANOUT_WORKERS caps concurrent requests)
+FANOUT_REVIEW = os.getenv("FANOUT_REVIEW") == "1" or st.secrets.get("FANOUT_REVIEW") == "1"
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS") or st.secrets.get("FANOUT_WORKERS") or 6)
+BLOCK_MAX_TOKENS = 1800 if MODEL_NAME == "gpt-4o" else 1400
+SYNTHESIS_MAX_TOKENS = 2000
+
+# Streaming mode: render each finished section while the completion is still arriving.
+# Enable via Secrets: STREAM_REVIEW="1" (applies to the single-completion review)
+STREAM_REVIEW = os.getenv("STREAM_REVIEW") == "1" or st.secrets.get("STREAM_REVIEW") == "1"
+
+# Review cache: identical submissions (same payload, prompts, model) reuse the stored report.
+# On by default; disable via Secrets: REVIEW_CACHE="0"
+@st.cache_resource
+def get_review_cache() -> ReviewCache | None:
+    if (os.getenv("REVIEW_CACHE") or st.secrets.get("REVIEW_CACHE") or "1") == "0":
+        return None
+    return ReviewCache(
+        os.getenv("REVIEW_CACHE_DIR") or st.secrets.get("REVIEW_CACHE_DIR") or os.path.join(os.path.dirname(__file__), ".cache"),
+        max_bytes=int(os.getenv("REVIEW_CACHE_MAX_MB") or st.secrets.get("REVIEW_CACHE_MAX_MB") or 200) * 1024 * 1024,
+        max_age_s=float(os.getenv("REVIEW_CACHE_MAX_AGE_DAYS") or st.secrets.get("REVIEW_CACHE_MAX_AGE_DAYS") or 30) * 86400,
+    )
 
-STRICT_NO_INVENTION = (
-    "CRITICAL: Base the assessment ONLY on the JSON fields provided. "
-    "For ANY block whose input is empty/whitespace, mark the block as Missing/Needs input. "
-    "Under each of its subheadings, output a single bullet: 'Missing/Needs input.' "
-    "Do NOT infer or fabricate. This review is stateless and only for this submission."
+REVIEW_CACHE = get_review_cache()
+
+# Review jobs: a process-wide worker pool over a SQLite job table, so reviews survive reruns/refreshes.
+# REVIEW_WORKERS caps concurrent model calls; REVIEW_QUEUE_MAX turns new jobs away when the queue is full.
+REVIEW_JOBS_DB = os.getenv("REVIEW_JOBS_DB") or st.secrets.get("REVIEW_JOBS_DB") or os.path.join(os.path.dirname(__file__), ".cache", "jobs.sqlite")
+REVIEW_WORKERS = int(os.getenv("REVIEW_WORKERS") or st.secrets.get("REVIEW_WORKERS") or 4)
+REVIEW_QUEUE_MAX = int(os.getenv("REVIEW_QUEUE_MAX") or st.secrets.get("REVIEW_QUEUE_MAX") or 50)
+JOB_POLL_S = 2.0
+
+REVIEW_CONFIG = ReviewConfig(
+    model=MODEL_NAME,
+    max_tokens=MAX_TOKENS,
+    fanout=FANOUT_REVIEW,
+    fanout_workers=FANOUT_WORKERS,
+    block_max_tokens=BLOCK_MAX_TOKENS,
+    synthesis_max_tokens=SYNTHESIS_MAX_TOKENS,
+    # Repair: sections missing from the review, missing a subheading or short of the minimum bullet counts
+    # are re-requested one section per call (concurrently) and spliced in. On by default; disable via
+    # Secrets: REPAIR_REVIEW="0"
+    repair=(os.getenv("REPAIR_REVIEW") or st.secrets.get("REPAIR_REVIEW") or "1") != "0",
 )
 
-# --- Depth-by-default (no toggle) ---
-DEPTH_MIN_COUNTS = {"Strengths": 4, "Weaknesses": 6, "Probing Questions": 10, "Suggested Explorations": 8}
-
-KENYA_LENS = """
-Contextualize critiques for Kenya/East Africa where relevant:
-- Mobile money (e.g., M-Pesa), agent networks, last-mile logistics, power/connectivity reliability.
-- Seasonality (agri, school terms), cash cycle & working capital constraints, FX risk, import duties/customs.
-- County-level regulation & permits, KEBS/product standards, data privacy basics.
-"""
-
-# NOTE: changed to qualitative Rating (Weak/Average/Good) instead of numeric score
-DEPTH_INSTRUCTION = f"""
-Depth Mode (default) — Be rigorous and specific while staying diagnostic (no company-specific step-by-step).
-For each major section:
-- Begin with a compact 'Rating: Weak/Average/Good' (no numeric score) + 1-line reason.
-- **Strengths**: ≥ {DEPTH_MIN_COUNTS['Strengths']} bullets spanning: Market, Customer, Competition, Ops, Finance, Impact, Team/Governance.
-- **Weaknesses**: ≥ {DEPTH_MIN_COUNTS['Weaknesses']} bullets; call out evidence gaps/assumptions.
-- **Probing Questions**: ≥ {DEPTH_MIN_COUNTS['Probing Questions']} bullets; cover Market, Customer, Competition, Ops, Finance/Unit economics, Impact/ESG, Legal/Regulatory, Distribution.
-- **Suggested Explorations**: ≥ {DEPTH_MIN_COUNTS['Suggested Explorations']} bullets; use experiment categories (smoke test, concierge/pilot, pricing, channel trial, churn interview, service blueprint, instrumentation).
-If a block is empty, keep only 'Missing/Needs input.' as required by the strict rule.
-"""
-
-CONSISTENCY_MATRIX = """
-Include cross-check bullets where relevant:
-- Value↔Segment fit, Segment↔Channels reach/cost, Costs↔Revenue seasonality/cash cycle, Activities↔Resources & Partners.
-If numbers are missing for unit economics, state the exact numbers required (price, gross margin %, CAC, churn %, payback).
-"""
-
-# Response template constant
-SINAPIS_RESPONSE_TEMPLATE = textwrap.dedent("""
-Use exactly these headings and order:
-
-1) Problem
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-2) Value Proposition
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-3) Unfair Advantage
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-4) Customer Segments
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-5) Channels
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-6) Customer Relationships
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-7) Key Activities
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-8) Key Resources
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-9) Key Partners
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-10) Revenue Streams
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-11) Cost Structure
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-12) Kingdom Impact
-   Strengths
-   Weaknesses
-   Probing Questions
-   Suggested Explorations
-
-13) Cross-Block Observations
-   Inconsistencies
-   Opportunities to Strengthen
-
-14) Final Assessment
-   Quick Wins
-   Deeper Strategic Questions
-   Overall Cohesiveness
-
-Footer: Advisory—Not Legal/Financial Advice.
-""").strip()
-
-# --- Optional: load rubric/workbook snippets from guides/ if present ---
-def read_guide_if_exists(rel_path: str, max_chars: int = 10000) -> str:
-    base_dir = os.path.dirname(__file__)
-    path = os.path.join(base_dir, rel_path)
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()[:max_chars]
-        except Exception:
-            return ""
-    return ""
+# Revision mode: a new draft of a business reviewed before (matched on REVISION_KEY, default business_name)
+# keeps the earlier critique of every unchanged block; only changed blocks and 13) + 14) are rewritten,
+# and each section is marked new or carried over. Enable via Secrets: REVISION_MODE="1"
+@st.cache_resource
+def get_revisions() -> RevisionStore | None:
+    if (os.getenv("REVISION_MODE") or st.secrets.get("REVISION_MODE")) != "1":
+        return None
+    root = os.getenv("REVIEW_CACHE_DIR") or st.secrets.get("REVIEW_CACHE_DIR") or os.path.join(os.path.dirname(__file__), ".cache")
+    os.makedirs(root, exist_ok=True)
+    key = os.getenv("REVISION_KEY") or st.secrets.get("REVISION_KEY") or "business_name"
+    return RevisionStore(os.path.join(root, "revisions.sqlite"), key_fields=tuple(k.strip() for k in key.split(",")))
+
+REVISIONS = get_revisions()
+
+def revision_version() -> str:
+    """Earlier critiques are only reused under the same prompts, guides and model."""
+    return f"{prefix_fingerprint()}:{MODEL_NAME}"
+
+# Near-duplicates: a submission whose canvas blocks are at least NEAR_DUPLICATE_THRESHOLD similar (estimated
+# Jaccard similarity of word 3-grams, default 0.8) to one reviewed before can reuse that review.
+# NEAR_DUPLICATE="offer" (default) lets the founder choose, "auto" reuses it directly, "0" turns it off.
+# A new draft of a business with an earlier draft in revision mode is re-reviewed incrementally instead.
+NEAR_DUPLICATE = os.getenv("NEAR_DUPLICATE") or st.secrets.get("NEAR_DUPLICATE") or "offer"
+
+@st.cache_resource
+def get_similar() -> SimilarityIndex | None:
+    if NEAR_DUPLICATE == "0" or not REVIEW_CACHE:  # reuse serves the earlier review from the cache
+        return None
+    root = os.getenv("REVIEW_CACHE_DIR") or st.secrets.get("REVIEW_CACHE_DIR") or os.path.join(os.path.dirname(__file__), ".cache")
+    os.makedirs(root, exist_ok=True)
+    threshold = float(os.getenv("NEAR_DUPLICATE_THRESHOLD") or st.secrets.get("NEAR_DUPLICATE_THRESHOLD") or 0.8)
+    return SimilarityIndex(os.path.join(root, "similar.sqlite"), threshold=threshold)
+
+SIMILAR = get_similar()
+
+def find_near_duplicate(payload: dict) -> Match | None:
+    """
+    Most similar earlier submission whose review is still cached (entries whose review is gone are
+    dropped). Only checks the cache: the review is read, and counted as a hit, when it is reused.
+    """
+    for match in SIMILAR.find(payload) if SIMILAR else []:
+        if REVIEW_CACHE.contains(match.key):
+            return match
+        SIMILAR.discard(match.key)
+    return None
+
+# Metrics: spans, tokens and estimated cost per upload/review, appended to a local JSONL log
+# (plus a Prometheus text export next to it). On by default; disable via Secrets: METRICS="0"
+@st.cache_resource
+def get_metrics() -> MetricsLog | None:
+    if (os.getenv("METRICS") or st.secrets.get("METRICS") or "1") == "0":
+        return None
+    path = os.getenv("METRICS_LOG") or st.secrets.get("METRICS_LOG") or os.path.join(os.path.dirname(__file__), ".cache", "metrics.jsonl")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return MetricsLog(path)
 
-RUBRIC_GUIDE = read_guide_if_exists(os.path.join("guides", "sinapis_rubric.md"))
-WORKBOOK_GUIDE = read_guide_if_exists(os.path.join("guides", "sinapis_workbook.md"))
+METRICS = get_metrics()
 
 # (Optional debug; enable via Secrets: DEBUG_GUIDES="1")
 if st.secrets.get("DEBUG_GUIDES") == "1":
+    RUBRIC_GUIDE, WORKBOOK_GUIDE = rubric_guide(), workbook_guide()
     if RUBRIC_GUIDE:
-        st.caption(f"Loaded rubric guide ({len(RUBRIC_GUIDE)} chars)")
+        st.caption(f"Loaded rubric guide ({count_tokens(RUBRIC_GUIDE)} tokens in {len(guide_chunks(RUBRIC_GUIDE))} chunks)")
     else:
         st.caption("Rubric guide not found")
     if WORKBOOK_GUIDE:
-        st.caption(f"Loaded workbook guide ({len(WORKBOOK_GUIDE)} chars)")
+        st.caption(f"Loaded workbook guide ({count_tokens(WORKBOOK_GUIDE)} tokens in {len(guide_chunks(WORKBOOK_GUIDE))} chunks)")
     else:
         st.caption("Workbook guide not found")
-
-# ---------- Label helpers & parser ----------
-def normalize_label(s: str) -> str:
-    if not s: return ""
-    s = s.strip()
-    s = re.sub(r"^\s*\d+\s*[\.\)\-:]?\s*", "", s)  # drop "1.", "1)", etc.
-    s = s.rstrip(":").strip().lower()
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-FIELD_ALIASES = {
-    "business_name": ["business name"],
-    "brief_description": ["brief description of business", "brief description"],
-    "problem": ["problem","1) problem","1. problem"],
-    "value_proposition": ["value proposition","2) value proposition","2. value proposition"],
-    "unfair_advantage": ["unfair advantage","3) unfair advantage","3. unfair advantage"],
-    "customer_segments": ["customer segments","4) customer segments","4. customer segments"],
-    "channels": ["channels","5) channels","5. channels"],
-    "customer_relationships": ["customer relationships","6) customer relationships","6. customer relationships"],
-    "key_activities": ["key activities","7) key activities","7. key activities"],
-    "key_resources": ["key resources","8) key resources","8. key resources"],
-    "key_partners": ["key partners","9) key partners","9. key partners"],
-    "revenue_streams": ["revenue streams","10) revenue streams","10. revenue streams"],
-    "cost_structure": ["cost structure","11) cost structure","11. cost structure"],
-    "kingdom_impact": ["kingdom impact","12) kingdom impact","12. kingdom impact"],
-}
-ALIAS_TO_KEY = {normalize_label(a): k for k, arr in FIELD_ALIASES.items() for a in arr}
-
-BASE_PHRASE = {
-    "business_name": "business name",
-    "brief_description": "brief description",
-    "problem": "problem",
-    "value_proposition": "value proposition",
-    "unfair_advantage": "unfair advantage",
-    "customer_segments": "customer segments",
-    "channels": "channels",
-    "customer_relationships": "customer relationships",
-    "key_activities": "key activities",
-    "key_resources": "key resources",
-    "key_partners": "key partners",
-    "revenue_streams": "revenue streams",
-    "cost_structure": "cost structure",
-    "kingdom_impact": "kingdom impact",
-}
-
-def guess_key_from_label_cell(left_text: str):
-    """Find the correct field key from a left-cell that may include a label + hint on multiple lines."""
-    if not left_text:
-        return None
-    lines = [normalize_label(x) for x in left_text.splitlines()]
-    lines = [x for x in lines if x]
-
-    # 1) exact alias match on any line
-    for ln in lines:
-        if ln in ALIAS_TO_KEY:
-            return ALIAS_TO_KEY[ln]
-
-    # 2) fuzzy contains (base phrase present anywhere on a line)
-    for ln in lines:
-        for key, phrase in BASE_PHRASE.items():
-            if phrase in ln:
-                return key
-    return None
-
-HINT_SNIPPETS = [
-    "provide a brief description",
-    "what customer problem",
-    "what are you offering",
-    "what is your uniqueness",
-    "which customer groups",
-    "through what means do you reach",
-    "what type of relationship",
-    "what tasks are vital",
-    "what assets are essential",
-    "which external organizations",
-    "how does your business earn revenue",
-    "what are the defining characteristics of your cost structure",
-    "where and how are you intentionally looking to make impact",
-]
-
-def clean_value(text: str) -> str:
-    lines = [ln.strip() for ln in (text or "").splitlines()]
-    out = []
-    for ln in lines:
-        if not ln: continue
-        if any(h in ln.lower() for h in HINT_SNIPPETS): continue
-        out.append(ln)
-    return "\n".join(out).strip()
-
-def parse_docx_to_payload(doc_bytes: bytes) -> dict:
-    """Parse either two-column tables (Section | Your Input) or our heading-style template."""
-    doc = Document(BytesIO(doc_bytes))
-    buf = {k: "" for k in FIELD_ALIASES.keys()}
-
-    # A) parse tables first (works with labels+hints in the left cell)
-    saw_nonempty = False
-    for table in doc.tables:
-        for row in table.rows:
-            if len(row.cells) < 2: continue
-            key = guess_key_from_label_cell(row.cells[0].text)
-            val = clean_value(row.cells[1].text)
-            if key and val:
-                buf[key] = val
-                saw_nonempty = True
-    if saw_nonempty:
-        return buf
-
-    # B) fallback to heading-style paragraphs (our template)
-    current_key = None
-    for p in doc.paragraphs:
-        t = (p.text or "").strip()
-        if not t: continue
-        norm = normalize_label(t)
-        if norm in ALIAS_TO_KEY:
-            current_key = ALIAS_TO_KEY[norm]; continue
-        if current_key:
-            if norm in ALIAS_TO_KEY:  # new heading inline
-                current_key = ALIAS_TO_KEY[norm]; continue
-            val = clean_value(t)
-            if val:
-                buf[current_key] = (buf[current_key] + "\n" + val).strip()
-    return buf
-
-# ---------- Markdown normalization & enforcement ----------
-MAJOR_SECTIONS = [
-    "1) Problem","2) Value Proposition","3) Unfair Advantage","4) Customer Segments",
-    "5) Channels","6) Customer Relationships","7) Key Activities","8) Key Resources",
-    "9) Key Partners","10) Revenue Streams","11) Cost Structure","12) Kingdom Impact",
-    "13) Cross-Block Observations","14) Final Assessment"
-]
-SUBS_STANDARD = ["Strengths","Weaknesses","Probing Questions","Suggested Explorations"]
-SUBS_13 = ["Inconsistencies","Opportunities to Strengthen"]
-SUBS_14 = ["Quick Wins","Deeper Strategic Questions","Overall Cohesiveness"]
-ADVISORY_TEXTS = {"Advisory—Not Legal/Financial Advice.","Footer: Advisory—Not Legal/Financial Advice."}
-
-def list_empty_blocks(payload: dict):
-    mapping = {
-        "1) Problem":"problem","2) Value Proposition":"value_proposition","3) Unfair Advantage":"unfair_advantage",
-        "4) Customer Segments":"customer_segments","5) Channels":"channels","6) Customer Relationships":"customer_relationships",
-        "7) Key Activities":"key_activities","8) Key Resources":"key_resources","9) Key Partners":"key_partners",
-        "10) Revenue Streams":"revenue_streams","11) Cost Structure":"cost_structure","12) Kingdom Impact":"kingdom_impact",
-    }
-    return [title for title, k in mapping.items() if not (payload.get(k) or "").strip()]
-
-def normalize_markdown(md_text: str) -> str:
-    out = []
-    for raw in md_text.splitlines():
-        line = raw.strip()
-        if not line: out.append(""); continue
-        if line in ADVISORY_TEXTS: continue
-        if line in MAJOR_SECTIONS: out.append("## " + line); continue
-        if line in (SUBS_STANDARD + SUBS_13 + SUBS_14): out.append("### " + line); continue
-        out.append(line)
-    return "\n".join(out).strip()
-
-def enforce_missing_for_empty_blocks(norm_md: str, empty_blocks: list[str]) -> str:
-    lines = norm_md.splitlines()
-    idx = [(i, lines[i][3:].strip()) for i in range(len(lines)) if lines[i].startswith("## ")]
-    idx.append((len(lines), None))
-    def subs_for(t): return SUBS_13 if t=="13) Cross-Block Observations" else (SUBS_14 if t=="14) Final Assessment" else SUBS_STANDARD)
-    out, i = [], 0
-    while i < len(lines):
-        if lines[i].startswith("## "):
-            title = lines[i][3:].strip()
-            next_pos = next((k for k,(pos,_) in enumerate(idx) if pos==i), None)
-            end = idx[next_pos+1][0] if next_pos is not None else len(lines)
-            if title in empty_blocks:
-                out.append(lines[i])
-                for s in subs_for(title):
-                    out.append(f"### {s}")
-                    out.append("• Missing/Needs input.")
-                i = end; continue
-        out.append(lines[i]); i += 1
-    return "\n".join(out).strip()
-
-# ---------- NEW: convert numeric "Score" to qualitative "Rating" ----------
-def convert_scores_to_ratings(md_text: str) -> str:
-    """
-    Replace lines like '• Score: 2/5 — reason' with '• Rating: Weak — reason'.
-    Mapping: 0–2 => Weak, 3 => Average, 4–5 => Good. Keeps any trailing reason.
-    """
-    pattern = re.compile(
-        r'^(?P<lead>[•\-\*]\s*)?score\s*[:\-]?\s*(?P<num>\d+(?:\.\d+)?)\s*/\s*5(?P<tail>\s*(?:[—\-–].*)?)$',
-        re.IGNORECASE | re.MULTILINE
+    st.caption(f"Prompts {prefix_fingerprint()} (static prefix shared by every review; guide excerpts follow the filled blocks)")
+
+# (Optional admin view of the review cache; enable via Secrets: DEBUG_CACHE="1")
+if st.secrets.get("DEBUG_CACHE") == "1" and REVIEW_CACHE:
+    cs = REVIEW_CACHE.stats()
+    st.caption(f"Review cache: {cs['hits']} hits / {cs['misses']} misses · {cs['entries']} entries ({cs['bytes'] / 1e6:.1f} MB)")
+
+# (Optional admin view of review metrics; enable via Secrets: DEBUG_METRICS="1")
+if st.secrets.get("DEBUG_METRICS") == "1" and METRICS:
+    with st.expander("Review metrics (admin)"):
+        st.table([
+            {"stage": r["stage"], "n": r["n"], "p50 (s)": f"{r['p50_s']:.3f}", "p95 (s)": f"{r['p95_s']:.3f}"}
+            for r in METRICS.stage_percentiles()
+        ])
+        st.table(METRICS.cost_by_model())
+        cs = get_client().stats()
+        st.caption("Model calls: " + " · ".join(f"{k} {v}" for k, v in sorted(cs.items()) if k != "breakers")
+                   + " · circuits: " + (", ".join(f"{m} {s}" for m, s in cs["breakers"].items()) or "none yet"))
+        st.download_button("Prometheus metrics", data=METRICS.prometheus_text, file_name="sinapis_metrics.prom", mime="text/plain")
+
+# ---------- Review jobs ----------
+def run_review_job(client, job, progress) -> tuple[str, bytes, dict]:
+    """Worker side of a job: model call(s), post-processing, DOCX, cache. Streams sections via `progress`."""
+    payload = job.payload
+    empty_blocks = list_empty_blocks(payload)
+    usage = Usage()
+    trace = Trace("review", job=job.id, model=MODEL_NAME, mode=REVIEW_CONFIG.mode, status="error",
+                  filled_blocks=filled_block_count(payload))
+    trace.add("queue", (job.started or job.created) - job.created)
+    prior = REVISIONS.latest(payload, revision_version()) if REVISIONS else None
+    reuse = prior.reusable(payload) if prior else {}
+    try:
+        if reuse:
+            # revision of an earlier draft: unchanged blocks keep their critique, the rest fan out
+            trace.fields.update(mode="revision", reused_blocks=len(reuse))
+            with trace.span("model"):
+                raw_md = run_fanout_review(client, payload, empty_blocks, REVIEW_CONFIG, usage, reuse=reuse)
+            with trace.span("postprocess"):
+                review = parse_review(raw_md, empty_blocks)
+                mark_revisions(review, set(reuse))
+                final_md = review.markdown()
+        elif STREAM_REVIEW and not FANOUT_REVIEW:
+            sections = SectionStream(empty_blocks)
+            with trace.span("model"):
+                for delta in stream_single_review(client, payload, empty_blocks, REVIEW_CONFIG, usage):
+                    if sections.feed(delta):
+                        if "first_section" not in trace.spans:
+                            trace.add("first_section", time.time() - job.started)
+                        progress(sections.markdown)
+            with trace.span("postprocess"):
+                sections.close()
+                review = sections.review
+                final_md = review.markdown()  # same shape as the other paths (and after a repair)
+        else:
+            with trace.span("model"):
+                raw_md = run_review(client, payload, empty_blocks, REVIEW_CONFIG, usage)
+            with trace.span("postprocess"):
+                review = parse_review(raw_md, empty_blocks)
+                final_md = review.markdown()
+        with trace.span("repair"):
+            problems = validate_review(review, empty_blocks)
+            repaired = repair_sections(client, payload, review, problems, REVIEW_CONFIG, usage) if REVIEW_CONFIG.repair else []
+            if repaired:
+                final_md = review.markdown()
+        trace.fields.update(invalid_sections=len(problems), repaired_sections=len(repaired))
+        with trace.span("docx"):
+            docx_bytes = build_docx(review, payload)
+        # a review written partly by the fallback model is served once, not stored as MODEL_NAME's
+        trace.fields["degraded"] = usage.degraded
+        if REVIEW_CACHE and not usage.degraded:
+            with trace.span("cache_put"):
+                REVIEW_CACHE.put(cache_key_for(payload, REVIEW_CONFIG), final_md, docx_bytes)
+        if REVISIONS and not usage.degraded:
+            REVISIONS.put(payload, revision_version(), review)
+        if SIMILAR and not usage.degraded:
+            SIMILAR.add(payload, cache_key_for(payload, REVIEW_CONFIG))
+        trace.fields.update(status="done", markdown_chars=len(final_md), docx_bytes=len(docx_bytes))
+        return final_md, docx_bytes, usage.as_dict()
+    except Exception as e:
+        trace.fields["error"] = type(e).__name__
+        raise
+    finally:
+        if METRICS:
+            trace.fields.update(usage.as_dict(), cost_usd=round(estimate_cost(MODEL_NAME, usage.as_dict()), 6))
+            trace.add("total", time.time() - job.created)
+            METRICS.record(trace)
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """One queue + worker pool per server process, shared by every session."""
+    client = get_client()
+    os.makedirs(os.path.dirname(REVIEW_JOBS_DB), exist_ok=True)
+    return JobQueue(
+        REVIEW_JOBS_DB,
+        runner=lambda job, progress: run_review_job(client, job, progress),
+        workers=REVIEW_WORKERS,
+        max_queued=REVIEW_QUEUE_MAX,
+        # a live review publishes progress at least once per call deadline (sections, then repairs)
+        stale_s=max(600.0, 3 * client.policy.deadline_s),
     )
-    def repl(m):
-        num = float(m.group('num'))
-        if num <= 2:
-            label = "Weak"
-        elif num < 4:  # i.e., exactly 3
-            label = "Average"
-        else:          # 4 or 5+
-            label = "Good"
-        lead = m.group('lead') or ""
-        tail = m.group('tail') or ""
-        return f"{lead}Rating: {label}{tail}"
-    return pattern.sub(repl, md_text)
-
-# ---------- DOCX builder (styled, centered logo, single footer) ----------
-def build_docx_from_markdown(md_text: str, founder_payload: dict) -> bytes:
-    doc = Document()
-    # logo
-    base_dir = os.path.dirname(__file__)
-    logo_path = os.path.join(base_dir, "assets", "logo.png")
-    if os.path.exists(logo_path):
-        try:
-            p = doc.add_paragraph(); r = p.add_run()
-            r.add_picture(logo_path, width=Inches(1.5)); p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        except Exception: pass
-    # title + description
-    title = doc.add_heading(f"Sinapis AI Coach – BMC Review of {founder_payload.get('business_name') or '(Unnamed Business)'}", level=0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    bd = founder_payload.get("brief_description") or "—"
-    meta = doc.add_paragraph(); r1 = meta.add_run("Description: "); r1.bold = True; meta.add_run(bd)
-    # styles
-    normal = doc.styles["Normal"].font; normal.name = "Calibri"; normal.size = Pt(11)
-    h1 = doc.styles["Heading 1"].font; h1.name = "Calibri"; h1.size = Pt(14); h1.bold = True; h1.color.rgb = RGBColor(31,78,121)
-    h2 = doc.styles["Heading 2"].font; h2.name = "Calibri"; h2.size = Pt(12); h2.bold = True; h2.color.rgb = RGBColor(0,0,0)
-    # content
-    for raw in md_text.splitlines():
-        line = raw.strip()
-        if line == "": doc.add_paragraph(""); continue
-        if line.startswith("## "):  doc.add_heading(line[3:].strip(), level=1); continue
-        if line.startswith("### "): doc.add_heading(line[4:].strip(), level=2); continue
-        if line.startswith(("• ","- ")): doc.add_paragraph(line[2:].strip(), style="List Bullet"); continue
-        doc.add_paragraph(line)
-    # footer
-    doc.add_paragraph().add_run("Advisory—Not Legal/Financial Advice.").italic = True
-    buf = BytesIO(); doc.save(buf); buf.seek(0); return buf.getvalue()
-
-def render_download_only(markdown_text: str, founder_payload: dict):
+
+# ---------- Download ----------
+def render_download_only(markdown_text: str, founder_payload: dict, docx_bytes: bytes | None = None):
     st.success("Your AI review is ready. Click below to download the Word report.")
     st.download_button(
         label="⬇️ Download your review (Word .docx)",
-        data=build_docx_from_markdown(markdown_text, founder_payload),
+        # built only when the button is clicked, not on every rerun of the page
+        data=docx_bytes if docx_bytes is not None else (lambda: build_docx_from_markdown(markdown_text, founder_payload)),
         file_name="Sinapis_AI_Coach_Assessment.docx",
         mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
         use_container_width=True
     )
 
+def reviewed_on(ts: float) -> str:
+    return time.strftime('%d %b %Y', time.localtime(ts))
+
+def submit_review(payload: dict, cache_key: str, trace: Trace):
+    """Queue a review job for this session (noting a matched earlier draft in revision mode)."""
+    prior = REVISIONS.latest(payload, revision_version()) if REVISIONS else None
+    if prior:
+        kept = len(prior.reusable(payload))
+        st.info(f"Matched your earlier draft from {reviewed_on(prior.created)}: "
+                f"{kept} unchanged block(s) keep their feedback; {filled_block_count(payload) - kept} changed block(s) and the overall assessment are rewritten.")
+    try:
+        with trace.span("submit"):
+            st.query_params["job"] = trace.fields["job"] = get_job_queue().submit(session_id, cache_key, payload)
+        trace.fields["status"] = "queued"
+    except QueueFull as e:
+        trace.fields["status"] = "queue_full"
+        st.warning(str(e))
+
 # ---------- UI ----------
 uploaded = st.file_uploader("Upload founder submission (.docx)", type=["docx"])
 submitted = st.button("Run Review", use_container_width=True, disabled=uploaded is None)
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
 
 # ---------- Run Review ----------
 if submitted and uploaded:
+    st.session_state.pop("near_duplicate", None)  # a new upload replaces any pending reuse offer
+    upload = Trace("upload", session=session_id, model=MODEL_NAME, upload_bytes=uploaded.size, status="parse_error")
     with st.spinner("Parsing your submission…"):
         try:
-            payload = parse_docx_to_payload(uploaded.read())
+            with upload.span("parse"):
+                payload = parse_docx_to_payload(uploaded)  # reads only the document part, not the media
         except Exception as e:
+            if METRICS: METRICS.record(upload)
             st.error(f"Failed to read .docx: {e}"); st.stop()
 
-        filled_blocks = sum(1 for k in [
-            "problem","value_proposition","unfair_advantage","customer_segments",
-            "channels","customer_relationships","key_activities","key_resources",
-            "key_partners","revenue_streams","cost_structure","kingdom_impact"
-        ] if (payload.get(k) or "").strip())
+        filled_blocks = filled_block_count(payload)
+        upload.fields.update(filled_blocks=filled_blocks, status="empty")
         st.info(f"Parsed {filled_blocks}/12 canvas blocks from the upload.")
         if filled_blocks == 0:
+            if METRICS: METRICS.record(upload)
             st.error("No canvas content detected. Ensure your file has a two-column table with section names in the left column and your input in the right column, or use our template.")
             st.stop()
 
-    with st.spinner("Contacting OpenAI…"):
-        empty_blocks = list_empty_blocks(payload)
-        user_message = (
-            "Founder Input (normalized JSON):\n"
-            + str(payload)
-            + "\n\nEMPTY_BLOCKS: " + str(empty_blocks)
-            + "\n\nUse the response template exactly."
-        )
-
-        # Build messages (deep critique by default + optional guides)
-        messages = [
-            {"role": "system", "content": SINAPIS_COACH_SYS},
-            {"role": "system", "content": MARKDOWN_INSTRUCTION},
-            {"role": "system", "content": STRICT_NO_INVENTION},
-            {"role": "system", "content": DEPTH_INSTRUCTION},
-            {"role": "system", "content": KENYA_LENS},
-            {"role": "system", "content": CONSISTENCY_MATRIX},
-            {"role": "system", "content": "Response Template:\n" + SINAPIS_RESPONSE_TEMPLATE},
-        ]
-        if RUBRIC_GUIDE:
-            messages.insert(0, {"role": "system", "content": "Sinapis Internal Rubric (excerpt):\n" + RUBRIC_GUIDE})
-        if WORKBOOK_GUIDE:
-            messages.insert(1, {"role": "system", "content": "Sinapis Workbook Notes (excerpt):\n" + WORKBOOK_GUIDE})
-        messages.append({"role": "user", "content": user_message})
-
-        try:
-            client = get_client()
-            resp = client.chat.completions.create(
-                model=MODEL_NAME,
-                temperature=0.0,
-                max_tokens=MAX_TOKENS,
-                messages=messages,
-            )
-            raw_md = resp.choices[0].message.content
-        except Exception as e:
-            st.error(f"OpenAI request failed (did not complete): {e}"); st.stop()
-
-    with st.spinner("Finalizing your report…"):
-        norm_md = normalize_markdown(raw_md)
-        final_md = enforce_missing_for_empty_blocks(norm_md, empty_blocks)
-        final_md = convert_scores_to_ratings(final_md)  # <-- convert any numeric Score to Rating
-        render_download_only(final_md, payload)
+    with upload.span("cache_lookup"):
+        cache_key = cache_key_for(payload, REVIEW_CONFIG)
+        cached = REVIEW_CACHE.get(cache_key) if REVIEW_CACHE else None
+    if cached:
+        upload.fields["status"] = "cache_hit"
+        st.query_params.pop("job", None)
+        st.caption("This exact submission was reviewed before; reusing that report.")
+        render_download_only(cached.markdown, payload, cached.docx)
+    else:
+        # a new draft of an earlier submission goes to revision mode, which keeps the founder's edits
+        revising = bool(REVISIONS and REVISIONS.latest(payload, revision_version()))
+        with upload.span("similar_lookup"):
+            match = None if revising else find_near_duplicate(payload)
+            earlier = REVIEW_CACHE.get(match.key) if match and NEAR_DUPLICATE == "auto" else None
+        if match:
+            upload.fields["similarity"] = round(match.similarity, 3)
+        if earlier:
+            upload.fields["status"] = "near_duplicate"
+            st.query_params.pop("job", None)
+            st.caption(f"This submission is {match.similarity:.0%} similar to one reviewed on {reviewed_on(match.created)}; reusing that report.")
+            render_download_only(earlier.markdown, payload)
+        elif match and NEAR_DUPLICATE != "auto":
+            upload.fields["status"] = "near_duplicate_offered"
+            st.query_params.pop("job", None)
+            st.session_state["near_duplicate"] = {"key": match.key, "similarity": match.similarity, "created": match.created,
+                                                  "payload": payload, "cache_key": cache_key}
+        else:
+            submit_review(payload, cache_key, upload)
+    if METRICS: METRICS.record(upload)
+
+# ---------- Near-duplicate offer (NEAR_DUPLICATE="offer") ----------
+offer = st.session_state.get("near_duplicate")
+if offer:
+    offer_box = st.empty()
+    with offer_box.container():
+        st.info(f"This submission is {offer['similarity']:.0%} similar to one reviewed on {reviewed_on(offer['created'])}. "
+                "You can reuse that review right away, or have a fresh one written for this upload.")
+        reuse_clicked = st.button("Reuse the earlier review", key="near_duplicate_reuse", use_container_width=True)
+        fresh_clicked = st.button("Write a fresh review", key="near_duplicate_fresh", use_container_width=True)
+    if reuse_clicked or fresh_clicked:
+        st.session_state.pop("near_duplicate")
+        offer_box.empty()
+        choice = Trace("near_duplicate", session=session_id, model=MODEL_NAME, similarity=round(offer["similarity"], 3),
+                       choice="reuse" if reuse_clicked else "fresh", status="reused")
+        earlier = REVIEW_CACHE.get(offer["key"]) if reuse_clicked else None  # may have been evicted meanwhile
+        if earlier:
+            render_download_only(earlier.markdown, offer["payload"])
+        else:
+            submit_review(offer["payload"], offer["cache_key"], choice)
+        if METRICS: METRICS.record(choice)
+
+# ---------- Review status (the ?job=<id> link survives refreshes and reconnects) ----------
+poll_again = False
+job_id = st.query_params.get("job")
+if job_id:
+    job = get_job_queue().get(job_id)
+    if job is None:
+        st.warning("That review is no longer available. Please upload the submission again.")
+    elif job.status == "queued":
+        pos = get_job_queue().position(job_id)
+        st.info(f"Your review is queued (position {pos}). You can leave this page open or come back to this link later.")
+        poll_again = True
+    elif job.status == "running":
+        st.info("Writing your review… You can leave this page open or come back to this link later.")
+        if job.partial_md:
+            st.markdown(job.partial_md)
+        poll_again = True
+    elif job.status == "error":
+        st.error(f"OpenAI request failed (did not complete): {job.error}")
+    else:
+        if STREAM_REVIEW and not FANOUT_REVIEW:
+            st.markdown(job.markdown)
+        if st.secrets.get("DEBUG_GUIDES") == "1" and job.usage:
+            u = job.usage
+            st.caption(f"Tokens: {u['prompt_tokens']} prompt ({u['cached_tokens']} cached) · {u['completion_tokens']} completion · {u['calls']} call(s)")
+        render_download_only(job.markdown, job.payload, job.docx)
 
 # ---------- Footer ----------
 st.caption("Advisory—Not Legal/Financial Advice.")
+
+if poll_again:
+    time.sleep(JOB_POLL_S)
+    st.rerun()
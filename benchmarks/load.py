@@ -0,0 +1,234 @@
+# benchmarks/load.py
+"""
+How many founders one Streamlit instance serves at once: N simulated sessions go through upload →
+parse → review → DOCX download against the local mock model; reports throughput, p50/p99 latency
+and memory per session.
+
+    python benchmarks/load.py --sessions 20
+    python benchmarks/load.py --sessions 50 --workers 8 --first-token 2 --dist lognormal --spread 0.5 --tokens-per-s 80
+    python benchmarks/load.py --sessions 20 --stream --error-rate 0.05
+    python benchmarks/load.py --sessions 20 --base-url http://127.0.0.1:8765/v1   # a mock you started yourself
+
+Each session is a Streamlit AppTest of app.py on its own thread, all in this process as sessions are
+on one server: it uploads a distinct synthetic submission through the file uploader, clicks Run
+Review, follows the job page's polling until the report is ready, and fetches the DOCX behind the
+download button. The app runs with LLM_BACKEND="mock"; the mock (coach.stub_openai) runs in its own
+process so its CPU and memory are not counted. The review cache is off so every session pays for a
+review. One warm-up session runs first (imports, guides) and is not counted.
+
+Latency is from the Run Review click to the downloaded report, so it includes queueing for one of
+REVIEW_WORKERS and the job page's 2 s polling, as a founder sees it. Memory per session is the
+growth in resident memory with every session still open, divided by the number of sessions.
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from coach.metrics import percentile
+from synth import table_doc
+
+APP = os.path.join(ROOT, "app.py")
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:  # not Linux: peak instead of current
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    cmd = [sys.executable, "-m", "coach.stub_openai", "--port", str(port),
+           "--first-token", str(args.first_token), "--dist", args.dist, "--spread", str(args.spread),
+           "--tokens-per-s", str(args.tokens_per_s), "--error-rate", str(args.error_rate),
+           "--rate-limit-rate", str(args.rate_limit_rate), "--retry-after", "0.5", "--seed", "1"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()  # "Stub OpenAI endpoint on …" once it listens
+    return proc, f"http://127.0.0.1:{port}/v1"
+
+
+def share_test_runtime():
+    """
+    AppTest installs a fresh mock Runtime for every run and removes it when the run ends, which would
+    pull it out from under the other sessions' running scripts. Keep the first one for every run
+    instead, as on a real server (one media file manager, shared caches); returns its media storage.
+    AppTest sessions also share one session id, so media files are kept rather than orphan-collected.
+    The compiled script is shared too.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    class KeepFiles(app_test.MemoryMediaFileStorage):
+        def delete_file(self, file_id):
+            pass  # every session stays open (and able to download) until the run ends
+
+    storages, shared = [], {}
+
+    def storage(prefix):
+        if not storages:
+            storages.append(KeepFiles(prefix))
+        return storages[0]
+
+    def instance(cls):
+        if "runtime" not in shared:
+            if cls._instance is None:
+                raise RuntimeError("Runtime hasn't been created!")
+            shared["runtime"] = cls._instance
+        return shared["runtime"]
+
+    script_cache = app_test.ScriptCache()  # compile app.py once, as a server does (and not from many threads at once)
+    app_test.MemoryMediaFileStorage = storage
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: "runtime" in shared or cls._instance is not None)
+    return lambda: storages[0]
+
+
+class Session:
+    def __init__(self, n: int, doc: bytes, timeout: float, media):
+        from streamlit.testing.v1 import AppTest
+
+        self.n, self.doc, self.timeout, self.media = n, doc, timeout, media
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.job = self.error = self.latency_s = None
+        self.docx_bytes = 0
+
+    def run(self):
+        try:
+            at = self.at
+            at.run()
+            at.file_uploader[0].set_value((f"submission_{self.n}.docx", self.doc, DOCX_MIME))
+            at.run()
+            t0 = time.perf_counter()
+            next(b for b in at.button if b.label == "Run Review").click()
+            at.run()  # follows the job page's own sleep-and-rerun polling while the review is queued/running
+            while not at.get("download_button") and not at.error and not at.exception:
+                if time.perf_counter() - t0 > self.timeout:
+                    raise TimeoutError(f"no report after {self.timeout:.0f}s")
+                at.run()
+            self.job = at.query_params.get("job")
+            if at.error or at.exception:
+                raise RuntimeError((at.error[0].value if at.error else at.exception[0].message)[:200])
+            url = at.get("download_button")[0].proto.url
+            data = self.media().get_file(url.rsplit("/", 1)[-1].split(".")[0]).content
+            if not data.startswith(b"PK"):
+                raise RuntimeError("download is not a .docx")
+            self.docx_bytes = len(data)
+            self.latency_s = time.perf_counter() - t0
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+
+def review_spans(metrics_log: str, jobs: set) -> dict[str, list[float]]:
+    out: dict[str, list[float]] = {}
+    with open(metrics_log, encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            if rec.get("event") == "review" and rec.get("job") in jobs:
+                for k, v in rec.get("spans", {}).items():
+                    out.setdefault(k, []).append(v)
+    return out
+
+
+def row(label: str, values: list[float]) -> str:
+    if not values:
+        return f"{label:<24}{'-':>9}{'-':>9}{'-':>9}"
+    v = sorted(values)
+    return f"{label:<24}{percentile(v, 0.5):>9.2f}{percentile(v, 0.99):>9.2f}{v[-1]:>9.2f}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--ramp", type=float, default=0.0, help="seconds over which sessions start (0 = all at once)")
+    ap.add_argument("--workers", type=int, default=4, help="REVIEW_WORKERS")
+    ap.add_argument("--stream", action="store_true", help="STREAM_REVIEW=1")
+    ap.add_argument("--fanout", action="store_true", help="FANOUT_REVIEW=1")
+    ap.add_argument("--base-url", default=None, help="use this mock endpoint instead of starting one")
+    ap.add_argument("--first-token", type=float, default=1.0, help="mock: median seconds to first token")
+    ap.add_argument("--dist", default="lognormal", choices=("fixed", "uniform", "lognormal", "exponential"))
+    ap.add_argument("--spread", type=float, default=0.4)
+    ap.add_argument("--tokens-per-s", type=float, default=400.0, help="mock completion speed")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0)
+    ap.add_argument("--timeout", type=float, default=600.0, help="seconds a session may take")
+    args = ap.parse_args(argv)
+
+    mock, base_url = (None, args.base_url) if args.base_url else start_mock(args)
+    tmp = tempfile.mkdtemp(prefix="sinapis-load-")  # kept: the review workers outlive main()
+    metrics_log = os.path.join(tmp, "metrics.jsonl")
+    os.environ.update(
+        LLM_BACKEND="mock", LLM_BASE_URL=base_url, REVIEW_CACHE="0", NEAR_DUPLICATE="0",
+        REVIEW_CACHE_DIR=tmp, REVIEW_JOBS_DB=os.path.join(tmp, "jobs.sqlite"), METRICS_LOG=metrics_log,
+        REVIEW_WORKERS=str(args.workers), REVIEW_QUEUE_MAX=str(max(50, args.sessions)),
+        STREAM_REVIEW="1" if args.stream else "0", FANOUT_REVIEW="1" if args.fanout else "0",
+    )
+    media = share_test_runtime()
+    try:
+        warm = Session(-1, table_doc(seed=10**6), args.timeout, media)
+        warm.run()
+        if warm.error:
+            print(f"warm-up session failed: {warm.error}")
+            return 1
+        gc.collect()
+        rss0 = rss_mb()
+
+        sessions = [Session(n, table_doc(seed=n), args.timeout, media) for n in range(args.sessions)]
+        threads = [threading.Thread(target=s.run, name=f"session-{s.n}") for s in sessions]
+        t0 = time.perf_counter()
+        for i, t in enumerate(threads):
+            if args.ramp:
+                time.sleep(max(0.0, t0 + args.ramp * i / len(threads) - time.perf_counter()))
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+        gc.collect()
+        rss1 = rss_mb()
+    finally:
+        if mock:
+            mock.terminate()
+
+    done = [s for s in sessions if s.error is None]
+    spans = review_spans(metrics_log, {s.job for s in sessions if s.job})
+    mode = "fan-out" if args.fanout else "streamed" if args.stream else "single"
+    print(f"{args.sessions} sessions ({mode} review, {args.workers} workers) against "
+          + (base_url if args.base_url else f"mock: first token {args.first_token:g}s {args.dist}, {args.tokens_per_s:g} tok/s, "
+             f"{args.error_rate:.0%} errors"))
+    print(f"completed {len(done)}/{len(sessions)} in {wall:.1f}s → {len(done) / wall * 60:.1f} sessions/min")
+    print(f"{'':<24}{'p50':>9}{'p99':>9}{'max':>9}")
+    print(row("click → report (s)", [s.latency_s for s in done]))
+    for name in ("queue", "model", "repair", "docx"):
+        print(row(f"  job {name} (s)", spans.get(name, [])))
+    print(f"memory: {rss0:.0f} MB after warm-up, {rss1:.0f} MB with {len(sessions)} sessions open "
+          f"→ {(rss1 - rss0) / max(1, len(sessions)):.2f} MB/session")
+    for s in sessions:
+        if s.error:
+            print(f"  session {s.n}: {s.error}")
+    print(f"metrics log: {metrics_log}")
+    return 0 if len(done) == len(sessions) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# benchmarks/parse_docx.py
+"""
+Streaming submission parser vs the python-docx object model: equivalence on a fixture corpus,
+then parse time and peak memory on large documents.
+
+    python benchmarks/parse_docx.py --runs 5 --rows 2000 --image-mb 20
+
+Fixtures are generated with python-docx: table and heading layouts, labels with hint text, merged
+cells (gridSpan, vMerge, gridBefore), hyperlinks, tabs and breaks, nested tables, empty blocks and
+embedded images. Exits non-zero if any fixture parses differently.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from coach.parser import (
+    ALIAS_TO_KEY, FIELD_ALIASES, clean_value, guess_key_from_label_cell, normalize_label, parse_docx_to_payload,
+)
+from synth import LABELS, heading_doc, save, table_doc
+
+
+def reference_parse(doc_bytes: bytes) -> dict:
+    """The python-docx parser the streaming one replaced (kept here as the equivalence oracle)."""
+    doc = Document(BytesIO(doc_bytes))
+    buf = {k: "" for k in FIELD_ALIASES.keys()}
+    saw_nonempty = False
+    for table in doc.tables:
+        for row in table.rows:
+            if len(row.cells) < 2: continue
+            key = guess_key_from_label_cell(row.cells[0].text)
+            val = clean_value(row.cells[1].text)
+            if key and val:
+                buf[key] = val
+                saw_nonempty = True
+    if saw_nonempty:
+        return buf
+    current_key = None
+    for p in doc.paragraphs:
+        t = (p.text or "").strip()
+        if not t: continue
+        norm = normalize_label(t)
+        if norm in ALIAS_TO_KEY:
+            current_key = ALIAS_TO_KEY[norm]; continue
+        if current_key:
+            val = clean_value(t)
+            if val:
+                buf[current_key] = (buf[current_key] + "\n" + val).strip()
+    return buf
+
+
+# ---------- fixtures ----------
+def tricky_doc() -> bytes:
+    """Merged cells, hyperlinks, breaks, tabs, nested tables and a heading layout after the table."""
+    doc = Document()
+    t = doc.add_table(rows=5, cols=3)
+    t.cell(0, 0).merge(t.cell(0, 1)).text = "Problem\nWhat customer problem"
+    t.cell(0, 2).text = "merged label row"
+    t.cell(1, 0).text = "Value Proposition"
+    t.cell(1, 1).merge(t.cell(3, 1)).text = "Spans three rows"
+    t.cell(2, 0).text = "Channels"
+    t.cell(3, 0).text = "Key Partners"
+    t.cell(4, 0).text = "Revenue Streams"
+    p = t.cell(4, 1).paragraphs[0]
+    p._p.append(parse_xml(
+        f'<w:hyperlink {nsdecls("w", "r")} r:id="rId99"><w:r><w:t>linked</w:t></w:r><w:r><w:tab/><w:t>tail</w:t></w:r></w:hyperlink>'
+    ))
+    p._p.append(parse_xml(
+        f'<w:r {nsdecls("w")}><w:br/><w:t xml:space="preserve"> after break </w:t><w:br w:type="page"/><w:noBreakHyphen/><w:cr/><w:ptab w:relativeTo="margin" w:alignment="left" w:leader="none"/></w:r>'
+    ))
+    inner = t.cell(4, 2).add_table(rows=1, cols=2)
+    inner.cell(0, 0).text, inner.cell(0, 1).text = "Cost Structure", "nested, ignored"
+    t2 = doc.add_table(rows=2, cols=2)
+    t2.cell(0, 0).text, t2.cell(0, 1).text = "Kingdom Impact", "Impact text"
+    t2.cell(1, 1).text = "only one cell"
+    tr = t2.rows[1]._tr
+    tr.get_or_add_trPr().append(parse_xml(f'<w:gridBefore {nsdecls("w")} w:val="1"/>'))
+    tr.remove(tr.tc_lst[0])
+    doc.add_paragraph("Key Activities")
+    doc.add_paragraph("heading text is ignored once a table matched")
+    return save(doc)
+
+
+def fixture_corpus() -> dict[str, bytes]:
+    return {
+        "table": table_doc(),
+        "table_no_hints": table_doc(hints=False),
+        "table_empty_blocks": table_doc(empty=("3) Unfair Advantage", "9) Key Partners", "12) Kingdom Impact")),
+        "table_all_empty": table_doc(empty=tuple(label for label, _ in LABELS)),
+        "table_long_blocks": table_doc(long_words=2000),
+        "table_image": table_doc(image_bytes=200_000),
+        "heading": heading_doc(),
+        "heading_empty_blocks": heading_doc(empty=("1) Problem", "5) Channels")),
+        "heading_image": heading_doc(image_bytes=200_000),
+        "tricky": tricky_doc(),
+        "blank": save(Document()),
+    }
+
+
+# ---------- timing ----------
+def measure(fn, data: bytes, runs: int) -> tuple[float, float]:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter(); fn(data); times.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    fn(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1e6
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--rows", type=int, default=2000, help="extra table rows in the large table document")
+    ap.add_argument("--image-mb", type=float, default=20, help="embedded image size in the large documents")
+    args = ap.parse_args(argv)
+
+    mismatches = [name for name, data in fixture_corpus().items() if parse_docx_to_payload(data) != reference_parse(data)]
+    print(f"equivalence: {len(fixture_corpus()) - len(mismatches)}/{len(fixture_corpus())} fixtures match", *mismatches)
+
+    image = int(args.image_mb * 1e6)
+    large = {
+        f"table +{args.rows} rows": table_doc(extra_rows=args.rows),
+        f"table + {args.image_mb:g} MB image": table_doc(image_bytes=image),
+        f"heading + {args.image_mb:g} MB image": heading_doc(image_bytes=image, paras=50),
+    }
+    print(f"\n{'document':<28}{'size MB':>9}{'python-docx ms':>16}{'peak MB':>9}{'streaming ms':>14}{'peak MB':>9}")
+    for name, data in large.items():
+        if parse_docx_to_payload(data) != reference_parse(data):
+            mismatches.append(name)
+        ref_ms, ref_mb = measure(reference_parse, data, args.runs)
+        new_ms, new_mb = measure(parse_docx_to_payload, data, args.runs)
+        print(f"{name:<28}{len(data) / 1e6:>9.1f}{ref_ms:>16.1f}{ref_mb:>9.1f}{new_ms:>14.1f}{new_mb:>9.1f}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# benchmarks/rerun_latency.py
+"""
+Wall time of Streamlit reruns of app.py (what every widget interaction pays) on the pages that use
+the process-wide resources, optionally next to an earlier commit, plus the per-resource setup cost
+that the caches avoid.
+
+    python benchmarks/rerun_latency.py --runs 30
+    python benchmarks/rerun_latency.py --runs 30 --baseline 1ca217c^ --baseline 1ca217c   # before/after the resource caching
+
+Pages: the idle upload page; the report page of a finished review (`?job=<id>`: job queue lookup,
+DOCX download); and Run Review on a submission reviewed before (parse, review cache lookup, report).
+Each tree is measured in its own process against the local stub endpoint, with fresh cache and job
+directories; the review behind the report page is run once first through the app itself. app.py is
+compiled once and reused, as a server does (AppTest alone recompiles it on every run). The
+component table compares building each resource of the current tree from scratch with the cached lookup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PAGES = ("upload page", "report page", "resubmit (cached)")
+
+
+def time_reruns(at, runs: int, before=lambda at: None) -> list[float]:
+    out = []
+    for _ in range(runs):
+        before(at)
+        t0 = time.perf_counter()
+        at.run()
+        out.append((time.perf_counter() - t0) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return out
+
+
+def per_call_ms(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / n
+
+
+def component_costs(n: int = 200) -> list[tuple[str, float, float]]:
+    import streamlit as st
+    from openai import OpenAI
+    from coach import prompts, report
+    from coach.resources import read_bytes, read_text
+
+    client = st.cache_resource(lambda: OpenAI(api_key="sk-bench", timeout=60.0))
+    client()
+    guide_paths = [os.path.join(ROOT, prompts.RUBRIC_PATH), os.path.join(ROOT, prompts.WORKBOOK_PATH)]
+    return [
+        ("OpenAI client", per_call_ms(lambda: OpenAI(api_key="sk-bench", timeout=60.0), max(1, n // 20)), per_call_ms(client, n)),
+        ("guides", per_call_ms(lambda: [prompts.guide_chunks.__wrapped__(read_text(p)) for p in guide_paths], n),
+         per_call_ms(lambda: [prompts.guide_chunks(g) for g in (prompts.rubric_guide(), prompts.workbook_guide())], n)),
+        ("logo bytes", per_call_ms(lambda: read_bytes(report.LOGO_PATH), n), per_call_ms(report.logo_bytes, n)),
+        ("prompt prefix", per_call_ms(lambda: (prompts.build_prefix_messages.__wrapped__(), prompts.build_guide_messages.__wrapped__(
+            prompts.rubric_guide(), prompts.workbook_guide(), tuple(prompts.MAJOR_SECTIONS), prompts.GUIDE_TOKEN_BUDGET)), n),
+         per_call_ms(lambda: (prompts.prefix_messages(), prompts.guide_messages()), n)),
+    ]
+
+
+def measure(root: str, doc_path: str, runs: int) -> dict[str, list[float]]:
+    """Rerun timings of `root`/app.py per page (run in a process of its own: imports `coach` from `root`)."""
+    tmp = tempfile.mkdtemp(prefix="rerun-bench-")
+    os.environ.update(REVIEW_CACHE_DIR=tmp, REVIEW_JOBS_DB=os.path.join(tmp, "jobs.sqlite"),
+                      METRICS_LOG=os.path.join(tmp, "metrics.jsonl"), STREAMLIT_LOGGER_LEVEL="error")
+    sys.path.insert(0, root)
+    from coach.stub_openai import serve_in_thread
+    from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+
+    script_cache = app_test.ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    _, os.environ["OPENAI_BASE_URL"] = serve_in_thread()
+    with open(doc_path, "rb") as f:
+        doc = f.read()
+    at = AppTest.from_file(os.path.join(root, "app.py"), default_timeout=120)
+    at.secrets["OPENAI_API_KEY"] = "sk-bench"
+    at.run()  # imports + first render
+    out = {"upload page": time_reruns(at, runs)}
+
+    at.file_uploader[0].set_value(("submission.docx", doc, DOCX_MIME))
+    at.run()
+    run_review = lambda at: next(b for b in at.button if b.label == "Run Review").click()
+    run_review(at)
+    at.run()  # follows the job page's polling until the review is done
+    while not at.get("download_button"):
+        if at.error or at.exception:
+            raise RuntimeError("review failed")
+        at.run()
+    out["report page"] = time_reruns(at, runs)
+    out["resubmit (cached)"] = time_reruns(at, runs, run_review)
+    return out
+
+
+def run_tree(root: str, doc_path: str, runs: int) -> dict[str, list[float]]:
+    cmd = [sys.executable, os.path.abspath(__file__), "--root", root, "--doc", doc_path, "--runs", str(runs), "--json"]
+    return json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+
+
+def export_tree(rev: str, dest: str) -> str:
+    tar = subprocess.run(["git", "-C", ROOT, "archive", "--format=tar", rev], check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=BytesIO(tar)) as t:
+        t.extractall(dest)
+    return dest
+
+
+def stats(ms: list[float]) -> str:
+    return f"{statistics.median(ms):7.2f} {sorted(ms)[int(0.95 * (len(ms) - 1))]:7.2f}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=30)
+    ap.add_argument("--baseline", action="append", default=[], help="git revision to measure next to the working tree (repeatable)")
+    ap.add_argument("--root", default=None, help=argparse.SUPPRESS)  # child process: measure this tree
+    ap.add_argument("--doc", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.root:
+        print(json.dumps(measure(args.root, args.doc, args.runs)))
+        return
+
+    sys.path.insert(0, ROOT)
+    from synth import table_doc
+
+    with tempfile.TemporaryDirectory() as tmp:
+        doc_path = os.path.join(tmp, "submission.docx")
+        with open(doc_path, "wb") as f:
+            f.write(table_doc())
+        trees = {rev: export_tree(rev, os.path.join(tmp, f"rev{i}")) for i, rev in enumerate(args.baseline)}
+        trees["current"] = ROOT
+        results = {name: run_tree(root, doc_path, args.runs) for name, root in trees.items()}
+
+    print(f"rerun of app.py, ms ({args.runs} reruns each)")
+    print(f"  {'':<20}" + "".join(f"{name[:15]:>17}" for name in results))
+    print(f"  {'':<20}" + "".join(f"{'median':>9}{'p95':>8}" for _ in results))
+    for page in PAGES:
+        print(f"  {page:<20}" + "".join(f"  {stats(r[page])}" for r in results.values()))
+    print("resource setup, current tree (uncached -> cached, ms per use)")
+    for name, before, after in component_costs():
+        print(f"  {name:<14} {before:9.4f} -> {after:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/resilience.py
+"""
+The resilient call layer against the local stub server with injected faults, next to a bare client
+(one attempt, fixed timeout, as the app used to call the API).
+
+    python benchmarks/resilience.py --calls 60 --concurrency 6
+
+Scenarios: flaky (random 5xx and 429), slow tail (a few responses far slower than the rest, which
+hedging cuts off), gpt-4o down (calls fall back to gpt-4o-mini) and full outage (the circuit opens
+and later calls fail fast instead of waiting out their timeouts). Backoff and timeouts are scaled
+down so the run takes seconds; the logic is the same as with the app's defaults.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openai import OpenAI
+
+from coach.metrics import percentile
+from coach.resilience import CallPolicy, ResilientClient
+from coach.stub_openai import Faults, serve_in_thread
+
+SCENARIOS = {
+    "flaky": (dict(error_rate=0.2, rate_limit_rate=0.1, retry_after_s=0.05), dict()),
+    "slow tail": (dict(slow_rate=0.08, slow_latency_s=1.5), dict(hedge=True, hedge_min_s=0.05)),
+    "gpt-4o down": (dict(down_models=("gpt-4o",)), dict()),
+    "outage": (dict(error_rate=1.0), dict()),
+}
+MESSAGES = [{"role": "user", "content": "## 1) Problem\nReview this block."}]
+
+
+def run(client, model: str, calls: int, concurrency: int) -> dict:
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            resp = client.chat.completions.create(model=model, max_tokens=1400, temperature=0.0, messages=MESSAGES)
+            return time.perf_counter() - t0, resp.model
+        except Exception:
+            return time.perf_counter() - t0, None
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(calls)))
+    times = sorted(t for t, _ in results)
+    ok = [m for _, m in results if m]
+    return {
+        "ok": len(ok), "fallback": sum(m != model for m in ok),
+        "p50": percentile(times, 0.5), "p99": percentile(times, 0.99), "mean": statistics.fmean(times),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--calls", type=int, default=60)
+    ap.add_argument("--concurrency", type=int, default=6)
+    ap.add_argument("--latency", type=float, default=0.05, help="normal stub response time (s)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    print(f"{'scenario':<13}{'client':<11}{'ok':>6}{'4o→mini':>9}{'p50 s':>8}{'p99 s':>8}  counters")
+    for name, (fault_kw, policy_kw) in SCENARIOS.items():
+        for label in ("bare", "resilient"):
+            server, base_url = serve_in_thread(latency_s=args.latency, faults=Faults(seed=args.seed, **fault_kw))
+            bare = OpenAI(api_key="stub", base_url=base_url, timeout=1.0, max_retries=0)
+            client = bare if label == "bare" else ResilientClient(bare, CallPolicy(
+                deadline_s=3.0, attempt_timeout_s=1.0, backoff_base_s=0.02, backoff_max_s=0.2,
+                breaker_reset_s=10.0,
+                tokens_per_s={"gpt-4o": 5000.0, "gpt-4o-mini": 8000.0}, **policy_kw,
+            ))
+            r = run(client, "gpt-4o", args.calls, args.concurrency)
+            counters = "" if label == "bare" else " ".join(f"{k}={v}" for k, v in sorted(client.stats().items()) if k != "breakers")
+            print(f"{name:<13}{label:<11}{r['ok']:>3}/{args.calls:<2}{r['fallback']:>9}{r['p50']:>8.3f}{r['p99']:>8.3f}  {counters}")
+            server.shutdown(); server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
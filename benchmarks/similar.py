@@ -0,0 +1,108 @@
+# benchmarks/similar.py
+"""
+Near-duplicate lookups as the similarity index grows.
+
+    python benchmarks/similar.py --sizes 500,2000,5000 --queries 300
+
+The index is filled with synthetic submissions (12 blocks of 40–80 words each). At each size it
+reports signature and index-probe time (p50/p99, ms) for lookups of near-copies and of unrelated
+submissions, and how the near-copies score: a re-upload with changed case and spacing, one block
+extended by a sentence, and 2% / 10% of the words replaced. Unrelated submissions should find nothing.
+Exits 1 if the find p99 of any query type exceeds `--target-ms` (default 1 ms, as in the README). Each
+lookup is timed twice and the faster run kept, so a preempted run on a busy host does not count.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from coach.metrics import percentile
+from coach.sections import BLOCK_KEYS
+from coach.similar import SimilarityIndex, signature
+from synth import WORDS
+
+VOCAB = [f"{a}{b}" for a in WORDS for b in ("", "s", "ing", "ed", "er")]
+EDITS = {
+    "cosmetic": lambda p, rng: {k: "  ".join(v.upper().split()) for k, v in p.items()},
+    "+sentence": lambda p, rng: dict(p, problem=p["problem"] + " We also ran a second pilot last season."),
+    "2% words": lambda p, rng: replace_words(p, rng, 0.02),
+    "10% words": lambda p, rng: replace_words(p, rng, 0.10),
+}
+
+
+def submission(seed: int) -> dict:
+    rng = random.Random(seed)
+    out = {k: " ".join(rng.choice(VOCAB) for _ in range(rng.randint(40, 80))) + "." for k in BLOCK_KEYS.values()}
+    out["business_name"] = f"Business {seed}"
+    return out
+
+
+def replace_words(payload: dict, rng: random.Random, frac: float) -> dict:
+    out = {}
+    for k, v in payload.items():
+        words = v.split()
+        out[k] = " ".join(rng.choice(VOCAB) if rng.random() < frac else w for w in words)
+    return out
+
+
+def timed_find(index: SimilarityIndex, payload: dict):
+    sig_ms = find_ms = float("inf")
+    for _ in range(2):
+        t0 = time.perf_counter()
+        signature(payload)
+        t1 = time.perf_counter()
+        matches = index.find(payload)
+        t2 = time.perf_counter()
+        sig_ms, find_ms = min(sig_ms, (t1 - t0) * 1e3), min(find_ms, (t2 - t1) * 1e3)
+    return sig_ms, find_ms - sig_ms, find_ms, matches
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", default="500,2000,5000", help="index sizes to measure at (comma-separated)")
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--threshold", type=float, default=0.8)
+    ap.add_argument("--target-ms", type=float, default=1.0, help="find p99 budget per lookup")
+    args = ap.parse_args(argv)
+
+    rng = random.Random(7)
+    over = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SimilarityIndex(os.path.join(tmp, "similar.sqlite"), threshold=args.threshold)
+        print(f"{'entries':>8}  {'query':<11}{'sig p50':>8}{'probe p50':>10}{'find p50':>9}{'find p99':>9}"
+              f"{'found':>8}{'sim min':>8}{'sim mean':>9}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            for seed in range(index.size, size):
+                index.add(submission(seed), f"key{seed}")
+            cases = {name: [edit(submission(rng.randrange(size)), rng) for _ in range(args.queries)] for name, edit in EDITS.items()}
+            cases["unrelated"] = [submission(10**9 + rng.randrange(10**9)) for _ in range(args.queries)]
+            for q in cases["cosmetic"][:20]:  # warm the page cache after the inserts
+                index.find(q)
+            for name, queries in cases.items():
+                sig_ms, probe_ms, find_ms, sims, found = [], [], [], [], 0
+                for q in queries:
+                    s, p, f, matches = timed_find(index, q)
+                    sig_ms.append(s); probe_ms.append(p); find_ms.append(f)
+                    if matches:
+                        found += 1
+                        sims.append(matches[0].similarity)
+                sig_ms.sort(); probe_ms.sort(); find_ms.sort()
+                sim_min = f"{min(sims):.2f}" if sims else "-"
+                sim_mean = f"{sum(sims) / len(sims):.2f}" if sims else "-"
+                print(f"{index.size:>8}  {name:<11}{percentile(sig_ms, 0.5):>8.3f}{max(0.0, percentile(probe_ms, 0.5)):>10.3f}"
+                      f"{percentile(find_ms, 0.5):>9.3f}{percentile(find_ms, 0.99):>9.3f}"
+                      f"{found:>4}/{len(queries):<3}{sim_min:>8}{sim_mean:>9}")
+                if percentile(find_ms, 0.99) > args.target_ms:
+                    over.append(f"{index.size} entries, {name}: find p99 {percentile(find_ms, 0.99):.3f} ms")
+    for line in over:
+        print(f"OVER TARGET ({args.target_ms} ms)  {line}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
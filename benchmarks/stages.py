@@ -0,0 +1,212 @@
+# benchmarks/stages.py
+"""
+Per-stage timings of the review path, checked against stored baselines.
+
+    python benchmarks/stages.py                 # run, compare with benchmarks/baselines.json
+    python benchmarks/stages.py --update        # run and store the results as the new baselines
+    python benchmarks/stages.py --only parse    # stages whose name contains "parse"
+
+Stages: parsing each synthetic submission (synth.submission_corpus), prompt assembly, post-processing
+of a realistic canned completion into the review tree, building the Word report, and the whole
+upload → report pipeline with an in-process stub client (single, fan-out, a revised draft that
+reuses 10 of 12 block critiques, and a completion with 3 sections short of the bullet minimums that
+get repaired), so no model time is included. Each stage reports the median of --runs timed runs. A stage regresses when it is more than
+--tolerance slower than its baseline (and by more than --min-ms); the exit code is then 1.
+
+Before timing, the repair checks make sure section repair keeps what it should: a rewrite of a missing
+section is inserted even when one bullet short, a rewrite one bullet short replaces a section half
+short, and a worse rewrite is discarded. A failed check also exits 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from coach import report
+from coach.markdown import parse_review
+from coach.parser import parse_docx_to_payload
+from coach.prompts import build_messages, section_template
+from coach.report import build_docx
+from coach.review import ReviewConfig, cache_key_for, repair_sections, run_fanout_review, run_review, single_review_messages
+from coach.revisions import mark_revisions
+from coach.sections import BLOCK_SECTIONS, MAJOR_SECTIONS, list_empty_blocks
+from coach.stub_openai import StubClient
+from coach.validate import section_deficit, validate_review
+from synth import PARTIAL, canned_completion, submission_corpus
+
+SHORT = ("3) Unfair Advantage", "7) Key Activities", "10) Revenue Streams")
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+def median_ms(fn, runs: int, min_run_s: float = 0.002) -> float:
+    """Median per-call time; fast stages are looped so each timed run lasts at least `min_run_s`."""
+    fn()  # warm-up (imports, caches that are process-wide in the app too)
+    number, t = 1, 0.0
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        t = time.perf_counter() - t0
+        if t >= min_run_s or number >= 10_000:
+            break
+        number *= 10
+    samples = []
+    gc.collect(); gc.disable()  # keep collections triggered by earlier stages out of this one
+    try:
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - t0) * 1000 / number)
+    finally:
+        gc.enable()
+    return statistics.median(samples)
+
+
+def fresh_docx(review, payload):
+    """build_docx without its memo, i.e. the cost of a report that was not built before."""
+    report._built.clear()
+    return build_docx(review, payload)
+
+
+def pipeline(doc: bytes, client, config: ReviewConfig) -> bytes:
+    payload = parse_docx_to_payload(doc)
+    empty_blocks = list_empty_blocks(payload)
+    cache_key_for(payload, config)
+    review = parse_review(run_review(client, payload, empty_blocks, config), empty_blocks)
+    repair_sections(client, payload, review, validate_review(review, empty_blocks), config)
+    return fresh_docx(review, payload)
+
+
+def revision_pipeline(doc: bytes, client, config: ReviewConfig, reuse: dict) -> bytes:
+    """A later draft: the blocks in `reuse` keep their earlier critique, the rest are regenerated."""
+    payload = parse_docx_to_payload(doc)
+    empty_blocks = list_empty_blocks(payload)
+    review = parse_review(run_fanout_review(client, payload, empty_blocks, config, reuse=reuse), empty_blocks)
+    mark_revisions(review, set(reuse))
+    return fresh_docx(review, payload)
+
+
+def stages(image_mb: float) -> dict:
+    corpus = submission_corpus(image_mb)
+    payload = parse_docx_to_payload(corpus["table"])
+    partial = parse_docx_to_payload(corpus["table_partial"])
+    completion = canned_completion()
+    review = parse_review(completion, [])
+    client = StubClient(review=canned_completion)
+    # the full review comes back short in SHORT; single-section repair calls answer in full
+    shallow = StubClient(review=lambda sections: canned_completion(sections, short=SHORT if len(sections) > 1 else ()))
+    single, fanout = ReviewConfig(), ReviewConfig(fanout=True)
+    reuse = {sec.title: sec.markdown() for sec in review.sections if sec.title in BLOCK_SECTIONS[2:]}  # 2 of 12 changed
+
+    out = {f"parse/{name}": (lambda d=data: parse_docx_to_payload(d)) for name, data in corpus.items()}
+    out.update({
+        "prompt/single": lambda: single_review_messages(payload, []),
+        "prompt/partial": lambda: single_review_messages(partial, list_empty_blocks(partial)),
+        "prompt/fanout": lambda: [
+            build_messages(payload, section_template([t]), [t]) for t in BLOCK_SECTIONS
+        ],
+        "prompt/cache_key": lambda: cache_key_for(payload, single),
+        "postprocess/full": lambda: parse_review(completion, []).markdown(),
+        "postprocess/partial": lambda: parse_review(completion, list(PARTIAL)).markdown(),
+        "validate/full": lambda: validate_review(review, []),
+        "docx/build": lambda: fresh_docx(review, payload),
+        "docx/memo": lambda: build_docx(review, payload),
+        "pipeline/single": lambda: pipeline(corpus["table"], client, single),
+        "pipeline/fanout": lambda: pipeline(corpus["table"], client, fanout),
+        "pipeline/partial": lambda: pipeline(corpus["table_partial"], client, single),
+        "pipeline/revision": lambda: revision_pipeline(corpus["table"], client, fanout, reuse),
+        "pipeline/repair": lambda: pipeline(corpus["table"], shallow, single),
+    })
+    assert list_empty_blocks(partial), "partial fixture should have empty blocks"
+    return out
+
+
+def one_short(md: str, title: str, sub: str = "Probing Questions") -> str:
+    """`md` with the first bullet under `sub` of section `title` dropped."""
+    lines = md.splitlines()
+    at = next(i for i, ln in enumerate(lines) if ln.lstrip("#").strip() == title)
+    at = next(i for i in range(at, len(lines)) if lines[i].lstrip("#").strip() == sub)
+    first = next(i for i in range(at + 1, len(lines)) if lines[i].startswith("- "))
+    return "\n".join(lines[:first] + lines[first + 1:])
+
+
+def check_repair() -> list[str]:
+    """Repair outcomes that must hold (see the module docstring); returns the failures."""
+    channels, activities = "5) Channels", "7) Key Activities"
+    cases = [
+        # (case, review as written, what the repair call answers, section, should the rewrite replace it)
+        ("missing section, rewrite one bullet short", canned_completion([t for t in MAJOR_SECTIONS if t != channels]),
+         one_short(canned_completion([channels]), channels), channels, True),
+        ("half short, rewrite one bullet short", canned_completion(short=(activities,)),
+         one_short(canned_completion([activities]), activities), activities, True),
+        ("one bullet short, rewrite half short", one_short(canned_completion(), activities),
+         canned_completion([activities], short=(activities,)), activities, False),
+    ]
+    failures = []
+    for name, written, answer, title, replace in cases:
+        review = parse_review(written, [])
+        problems = validate_review(review, [])
+        before = review.section(title)
+        replaced = repair_sections(StubClient(review=lambda sections, md=answer: md), {"business_name": "Check"}, review,
+                                   {title: problems[title]}, ReviewConfig())
+        after = review.section(title)
+        kept = after is not None and (section_deficit(after) == 1 if replace else after is before)
+        if (title in replaced) != replace or not kept:
+            failures.append(f"repair check failed ({name}): replaced={title in replaced}, expected {replace}")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=15)
+    ap.add_argument("--only", default="", help="run only stages whose name contains this")
+    ap.add_argument("--image-mb", type=float, default=5, help="embedded image size in the image fixtures")
+    ap.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown vs baseline (0.5 = 50%%)")
+    ap.add_argument("--min-ms", type=float, default=0.2, help="ignore slowdowns smaller than this")
+    ap.add_argument("--update", action="store_true", help="store these results as the baselines")
+    ap.add_argument("--baselines", default=BASELINES)
+    args = ap.parse_args(argv)
+
+    stored = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines, "r", encoding="utf-8") as f:
+            stored = json.load(f).get("stages", {})
+
+    failures = check_repair()
+    for f in failures:
+        print(f)
+    results, regressions = {}, []
+    print(f"{'stage':<24}{'ms':>10}{'baseline':>10}{'ratio':>8}")
+    for name, fn in stages(args.image_mb).items():
+        if args.only not in name:
+            continue
+        ms = results[name] = median_ms(fn, args.runs)
+        base = stored.get(name)
+        flag = ""
+        if base and ms > base * (1 + args.tolerance) and ms - base > args.min_ms:
+            regressions.append(name); flag = "  REGRESSION"
+        print(f"{name:<24}{ms:>10.3f}{base if base else float('nan'):>10.3f}{ms / base if base else float('nan'):>8.2f}{flag}")
+
+    if args.update:
+        stored.update({k: round(v, 4) for k, v in results.items()})
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump({"machine": f"{platform.machine()} / Python {platform.python_version()}", "stages": stored}, f, indent=1)
+            f.write("\n")
+        print(f"baselines written to {args.baselines}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
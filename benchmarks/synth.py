@@ -0,0 +1,129 @@
+# benchmarks/synth.py
+"""
+Synthetic BMC submissions and canned model output for the benchmarks.
+
+Submissions cover both layouts the parser accepts (two-column table, heading template), labels and
+answers carrying the template's hint text, empty and very long blocks, and embedded images.
+Canned reviews are shaped like real completions: some bare section titles, a numeric score line per
+section, the depth minimums met with sentence-length bullets, and the advisory footer.
+"""
+import random
+import struct
+import zlib
+from io import BytesIO
+
+from docx import Document
+from docx.shared import Inches
+
+from coach.prompts import DEPTH_MIN_COUNTS
+from coach.sections import MAJOR_SECTIONS, subs_for
+
+LABELS = [
+    ("Business Name", ""), ("Brief Description of Business", "Provide a brief description of the business"),
+    ("1) Problem", "What customer problem are you solving?"), ("2) Value Proposition", "What are you offering?"),
+    ("3) Unfair Advantage", "What is your uniqueness?"), ("4) Customer Segments", "Which customer groups do you serve?"),
+    ("5) Channels", "Through what means do you reach them?"), ("6) Customer Relationships", "What type of relationship?"),
+    ("7) Key Activities", "What tasks are vital?"), ("8) Key Resources", "What assets are essential?"),
+    ("9) Key Partners", "Which external organizations?"), ("10) Revenue Streams", "How does your business earn revenue?"),
+    ("11) Cost Structure", "What are the defining characteristics of your cost structure?"),
+    ("12) Kingdom Impact", "Where and how are you intentionally looking to make impact?"),
+]
+WORDS = (
+    "customers farmers Nairobi pricing margin cooperative mobile money distribution retail supply chain "
+    "smallholder loans training demand churn subscription partners county logistics inventory cash flow "
+    "growth pilot revenue impact community trust quality delivery season harvest market agents"
+).split()
+
+
+def answer(i: int, words: int = 40) -> str:
+    rng = random.Random(i)
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def png_bytes(size_bytes: int, seed: int = 0) -> bytes:
+    """A valid PNG padded with an ancillary chunk to roughly `size_bytes` (incompressible)."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    pad = random.Random(seed).randbytes(max(0, size_bytes))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b"teXt", b"pad\x00" + pad.hex().encode()[:size_bytes])
+            + chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff")) + chunk(b"IEND", b""))
+
+
+def save(doc) -> bytes:
+    buf = BytesIO(); doc.save(buf); return buf.getvalue()
+
+
+def table_doc(empty=(), hints=True, image_bytes=0, extra_rows=0, long_words=40, seed=0) -> bytes:
+    """
+    Two-column 'Section | Your Input' submission; hints go in both the label and the answer cell.
+    A different `seed` gives different answers (distinct submissions for load tests).
+    """
+    doc = Document()
+    doc.add_heading("Ascent BMC Submission", level=1)
+    if image_bytes:
+        doc.add_picture(BytesIO(png_bytes(image_bytes)), width=Inches(1))
+    t = doc.add_table(rows=1, cols=2)
+    t.rows[0].cells[0].text, t.rows[0].cells[1].text = "Section", "Your Input"
+    for i, (label, hint) in enumerate(LABELS):
+        row = t.add_row().cells
+        row[0].text = label + ("\n" + hint if hints and hint else "")
+        row[1].text = "" if label in empty else (hint + "\n" if hints and hint else "") + answer(i + 1000 * seed, long_words)
+    for i in range(extra_rows):
+        row = t.add_row().cells
+        row[0].text, row[1].text = f"Note {i}", answer(i)
+    return save(doc)
+
+
+def heading_doc(empty=(), image_bytes=0, paras=2, words=40) -> bytes:
+    """Our heading-style template: a label paragraph, its hint, then answer paragraphs."""
+    doc = Document()
+    doc.add_paragraph("Ascent BMC Template")
+    for i, (label, hint) in enumerate(LABELS):
+        doc.add_heading(label, level=2)
+        if hint:
+            doc.add_paragraph(hint)
+        if label not in empty:
+            for k in range(paras):
+                doc.add_paragraph(answer(i + k, words))
+        if image_bytes and i == 3:
+            doc.add_picture(BytesIO(png_bytes(image_bytes)), width=Inches(1))
+    return save(doc)
+
+
+PARTIAL = ("3) Unfair Advantage", "8) Key Resources", "9) Key Partners", "11) Cost Structure", "12) Kingdom Impact")
+
+
+def submission_corpus(image_mb: float = 5) -> dict[str, bytes]:
+    """The documents the stage benchmarks parse."""
+    return {
+        "table": table_doc(),
+        "table_partial": table_doc(empty=PARTIAL),
+        "table_long": table_doc(long_words=1500),
+        "table_image": table_doc(image_bytes=int(image_mb * 1e6)),
+        "heading": heading_doc(),
+        "heading_long": heading_doc(paras=12, words=120),
+        "heading_image": heading_doc(image_bytes=int(image_mb * 1e6)),
+    }
+
+
+def canned_completion(sections=MAJOR_SECTIONS, bullet_words: int = 9, seed: int = 0, short=()) -> str:
+    """
+    A full review as the model writes it (about 4k tokens for all 14 sections): every other section
+    title without its '##', a 'Score: n/5' line, bullets meeting DEPTH_MIN_COUNTS, the footer.
+    Sections in `short` get half the minimum bullets, as gpt-4o-mini sometimes writes them.
+    """
+    rng = random.Random(seed)
+    out = []
+    for n, title in enumerate(sections):
+        out.append(title if n % 2 else "## " + title)
+        out.append(f"Score: {rng.randint(1, 5)}/5 — " + " ".join(rng.choice(WORDS) for _ in range(bullet_words)))
+        out.append("")
+        for sub in subs_for(title):
+            out.append(sub if n % 3 == 0 else "### " + sub)
+            need = DEPTH_MIN_COUNTS.get(sub, 3)
+            for _ in range(need // 2 if title in short else need):
+                out.append("- " + " ".join(rng.choice(WORDS) for _ in range(bullet_words)).capitalize() + ".")
+            out.append("")
+    out.append("Advisory—Not Legal/Financial Advice.")
+    return "\n".join(out)
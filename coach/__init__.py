@@ -0,0 +1 @@
+"""Supporting modules for the Sinapis AI Coach Streamlit app (app.py)."""
@@ -0,0 +1,197 @@
+# coach/batch.py
+"""
+Headless cohort runner: review every .docx in a folder and write one Word report per submission.
+
+    python -m coach.batch submissions/ --out reports/ --concurrency 4 --rpm 60 --tpm 200000
+
+Uses the same parser, prompts, post-processing and DOCX builder as the Streamlit app. Finished files
+are recorded in <out>/manifest.jsonl, so re-running after a crash skips them (reports written partly by
+the fallback model, `fallback_calls` > 0, are redone); <out>/summary.csv lists
+parse coverage ("Parsed X/12") and stage timings for every submission.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from coach.llm import BACKENDS, make_llm_client
+from coach.markdown import parse_review
+from coach.metrics import estimate_cost
+from coach.parser import parse_docx_to_payload
+from coach.ratelimit import RateLimitedClient
+from coach.report import build_docx
+from coach.resilience import CallPolicy, ResilientClient
+from coach.review import ReviewConfig, Usage, repair_sections, run_review
+from coach.sections import filled_block_count, list_empty_blocks
+from coach.validate import validate_review
+
+SUMMARY_FIELDS = [
+    "file", "status", "business_name", "parsed_blocks", "report",
+    "invalid_sections", "repaired_sections", "parse_s", "review_s", "docx_s", "total_s",
+    "prompt_tokens", "cached_tokens", "completion_tokens", "fallback_calls", "cost_usd", "error",
+]
+
+
+class Manifest:
+    """Append-only JSONL checkpoint; the latest record per file wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self.records[rec["file"]] = rec
+
+    def is_done(self, name: str, sha256: str, out_dir: str) -> bool:
+        rec = self.records.get(name)
+        return bool(
+            rec and rec.get("status") == "done" and rec.get("sha256") == sha256 and not rec.get("fallback_calls")
+            and os.path.exists(os.path.join(out_dir, rec.get("report") or ""))
+        )
+
+    def record(self, rec: dict):
+        with self._lock:
+            self.records[rec["file"]] = rec
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def report_name(filename: str) -> str:
+    return os.path.splitext(filename)[0] + "_review.docx"
+
+
+def review_file(path: str, out_dir: str, client, config: ReviewConfig, sha256: str, write_markdown: bool = False) -> dict:
+    name = os.path.basename(path)
+    rec = {"file": name, "sha256": sha256, "status": "error", "report": "", "error": ""}
+    t0 = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            payload = parse_docx_to_payload(f)
+        t1 = time.perf_counter()
+        rec.update(business_name=payload.get("business_name") or "", parsed_blocks=filled_block_count(payload), parse_s=round(t1 - t0, 3))
+        if rec["parsed_blocks"] == 0:
+            rec.update(status="skipped", error="no canvas content detected", total_s=round(t1 - t0, 3))
+            return rec
+
+        empty_blocks = list_empty_blocks(payload)
+        usage = Usage()
+        review = parse_review(run_review(client, payload, empty_blocks, config, usage), empty_blocks)
+        problems = validate_review(review, empty_blocks)
+        repaired = repair_sections(client, payload, review, problems, config, usage) if config.repair else []
+        rec.update(invalid_sections=len(problems), repaired_sections=len(repaired))
+        t2 = time.perf_counter()
+        rec.update(usage.as_dict(), cost_usd=round(estimate_cost(config.model, usage.as_dict()), 6))
+
+        docx_bytes = build_docx(review, payload)
+        out_name = report_name(name)
+        with open(os.path.join(out_dir, out_name), "wb") as f:
+            f.write(docx_bytes)
+        if write_markdown:
+            with open(os.path.join(out_dir, os.path.splitext(out_name)[0] + ".md"), "w", encoding="utf-8") as f:
+                f.write(review.markdown())
+        t3 = time.perf_counter()
+        rec.update(status="done", report=out_name, review_s=round(t2 - t1, 3), docx_s=round(t3 - t2, 3), total_s=round(t3 - t0, 3))
+    except Exception as e:
+        rec.update(error=f"{type(e).__name__}: {e}", total_s=round(time.perf_counter() - t0, 3))
+    return rec
+
+
+def write_summary(path: str, records: list[dict]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        w.writeheader()
+        for rec in sorted(records, key=lambda r: r["file"]):
+            w.writerow({k: rec.get(k, "") for k in SUMMARY_FIELDS})
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_client(base_url: str | None, backend: str = "openai"):
+    api_key = os.getenv("OPENAI_API_KEY") or ("stub" if base_url else None)
+    if backend == "openai" and not api_key:
+        sys.exit("Missing OPENAI_API_KEY (or pass --base-url / --backend mock to use a local stub endpoint).")
+    return make_llm_client(backend, api_key=api_key, base_url=base_url)
+
+
+def run_batch(in_dir: str, out_dir: str, client, config: ReviewConfig, concurrency: int = 4, write_markdown: bool = False, log=print) -> list[dict]:
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(out_dir, "manifest.jsonl"))
+    files = sorted(
+        os.path.join(in_dir, n) for n in os.listdir(in_dir)
+        if n.lower().endswith(".docx") and not n.startswith("~$")  # skip Word lock files
+    )
+    todo = []
+    for path in files:
+        sha = file_sha256(path)
+        if manifest.is_done(os.path.basename(path), sha, out_dir):
+            log(f"skip  {os.path.basename(path)} (already reviewed)")
+        else:
+            todo.append((path, sha))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(review_file, path, out_dir, client, config, sha, write_markdown) for path, sha in todo]
+        for fut in as_completed(futures):
+            rec = fut.result()
+            manifest.record(rec)
+            log(f"{rec['status']:<5} {rec['file']} parsed {rec.get('parsed_blocks', 0)}/12 in {rec.get('total_s', 0)}s {rec.get('error') or ''}".rstrip())
+
+    names = {os.path.basename(p) for p in files}
+    records = [r for n, r in manifest.records.items() if n in names]
+    write_summary(os.path.join(out_dir, "summary.csv"), records)
+    return records
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Review a folder of BMC .docx submissions without the Streamlit UI.")
+    ap.add_argument("in_dir", help="folder of .docx submissions")
+    ap.add_argument("--out", required=True, help="folder for reports, manifest.jsonl and summary.csv")
+    ap.add_argument("--concurrency", type=int, default=4, help="submissions reviewed at once")
+    ap.add_argument("--rpm", type=float, default=None, help="requests-per-minute limit")
+    ap.add_argument("--tpm", type=float, default=None, help="tokens-per-minute limit (prompt + max completion)")
+    ap.add_argument("--model", default="gpt-4o" if os.getenv("USE_GPT4O") == "1" else "gpt-4o-mini")
+    ap.add_argument("--fanout", action="store_true", help="review each canvas block in its own request")
+    ap.add_argument("--backend", choices=BACKENDS, default=os.getenv("LLM_BACKEND") or "openai",
+                    help="openai, mock (an OpenAI-compatible endpoint, --base-url) or stub (in-process canned answers)")
+    ap.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"), help="alternative endpoint, e.g. a local stub")
+    ap.add_argument("--markdown", action="store_true", help="also write the review markdown next to each report")
+    ap.add_argument("--deadline", type=float, default=180.0, help="seconds per model call, retries included")
+    ap.add_argument("--hedge", action="store_true", help="send a second request when a call runs past the observed p95")
+    ap.add_argument("--no-repair", action="store_true", help="keep sections that fail validation as the model wrote them")
+    ap.add_argument("--no-fallback", action="store_true", help="never fall back from gpt-4o to gpt-4o-mini")
+    args = ap.parse_args(argv)
+
+    client = make_client(args.base_url, args.backend)
+    if args.rpm or args.tpm:
+        client = RateLimitedClient(client, rpm=args.rpm, tpm=args.tpm)
+    policy = CallPolicy(deadline_s=args.deadline, hedge=args.hedge, **({"fallback": {}} if args.no_fallback else {}))
+    client = ResilientClient(client, policy)  # outermost, so every retry also waits for the rate limiter
+    config = ReviewConfig.for_model(args.model, fanout=args.fanout, repair=not args.no_repair)
+    records = run_batch(args.in_dir, args.out, client, config, args.concurrency, args.markdown)
+    failed = [r for r in records if r.get("status") == "error"]
+    cost = sum(r.get("cost_usd") or 0 for r in records)
+    print(f"{len(records) - len(failed)}/{len(records)} submissions reviewed (est. ${cost:.2f}); summary in {os.path.join(args.out, 'summary.csv')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
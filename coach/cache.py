@@ -0,0 +1,129 @@
+# coach/cache.py
+"""
+Content-addressed on-disk cache of finished reviews.
+
+A review is keyed by a hash of everything that determines the completion: the normalized founder
+payload, every system message, the model and its token limit. Entries hold the final markdown and
+the built DOCX bytes, live in a single SQLite file, and are evicted by age and then least-recent use
+once the store grows past its size cap. Hit/miss counters are kept in the same file so they survive
+Streamlit reruns and restarts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+def normalize_payload(payload: dict) -> dict:
+    """Strip surrounding/trailing whitespace so cosmetic re-uploads hash the same."""
+    out = {}
+    for k in sorted(payload):
+        v = payload.get(k) or ""
+        out[k] = "\n".join(ln.rstrip() for ln in str(v).strip().splitlines())
+    return out
+
+
+def review_cache_key(payload: dict, system_messages: list[str], model: str, max_tokens: int, mode: str = "single") -> str:
+    blob = json.dumps(
+        {
+            "payload": normalize_payload(payload),
+            "system": list(system_messages),
+            "model": model,
+            "max_tokens": max_tokens,
+            "mode": mode,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedReview:
+    markdown: str
+    docx: bytes
+    created: float
+
+
+class ReviewCache:
+    def __init__(self, root: str, max_bytes: int = 200 * 1024 * 1024, max_age_s: float = 30 * 86400):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, "reviews.sqlite")
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS reviews ("
+                " key TEXT PRIMARY KEY, markdown TEXT NOT NULL, docx BLOB NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS reviews_accessed ON reviews(accessed)")
+            db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _bump(db, name: str):
+        db.execute(
+            "INSERT INTO counters(name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> CachedReview | None:
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT markdown, docx, created FROM reviews WHERE key = ?", (key,)).fetchone()
+            if row and now - row[2] > self.max_age_s:
+                db.execute("DELETE FROM reviews WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._bump(db, "misses")
+                return None
+            db.execute("UPDATE reviews SET accessed = ? WHERE key = ?", (now, key))
+            self._bump(db, "hits")
+        return CachedReview(markdown=row[0], docx=bytes(row[1]), created=row[2])
+
+    def contains(self, key: str) -> bool:
+        """Whether a live entry exists, without counting a hit/miss or refreshing its LRU age."""
+        with self._connect() as db:
+            row = db.execute("SELECT created FROM reviews WHERE key = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.max_age_s
+
+    def put(self, key: str, markdown: str, docx: bytes):
+        now = time.time()
+        size = len(markdown.encode("utf-8")) + len(docx)
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO reviews(key, markdown, docx, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, markdown, docx, size, now, now),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db, now: float):
+        db.execute("DELETE FROM reviews WHERE created < ?", (now - self.max_age_s,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM reviews").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # least recently used first, until the store fits again
+        for key, size in db.execute("SELECT key, size FROM reviews ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM reviews WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> dict:
+        with self._connect() as db:
+            counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reviews").fetchone()
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": entries, "bytes": size}
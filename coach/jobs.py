@@ -0,0 +1,233 @@
+# coach/jobs.py
+"""
+Durable review jobs shared by every Streamlit session in the process.
+
+Jobs live in a SQLite table, so a review that is queued or already running survives browser refreshes,
+disconnects and widget reruns; the page only keeps the job id and polls. A fixed pool of worker threads
+caps how many reviews call the model at once. Queued jobs are taken round-robin across sessions (each
+session's oldest job first), so one founder submitting several files cannot starve the others.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+# Fair order: the n-th queued job of every session goes before any session's (n+1)-th; among equal
+# turns the session served least recently goes first, then the oldest job.
+FAIR_ORDER_SQL = """
+SELECT q.id,
+       ROW_NUMBER() OVER (PARTITION BY q.session ORDER BY q.created) AS turn,
+       COALESCE((SELECT MAX(s.started) FROM jobs s WHERE s.session = q.session), 0) AS served
+FROM jobs q WHERE q.status = 'queued'
+ORDER BY turn, served, q.created
+"""
+
+log = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when admission control turns a job away."""
+
+
+@dataclass
+class Job:
+    id: str
+    session: str
+    status: str  # queued | running | done | error
+    created: float
+    started: float | None
+    finished: float | None
+    cache_key: str
+    payload: dict
+    partial_md: str
+    markdown: str
+    docx: bytes | None
+    error: str
+    usage: dict
+
+
+class JobQueue:
+    """
+    `runner(job, progress)` does the actual review of `job.payload` and returns (markdown, docx_bytes,
+    usage_dict); it may call `progress(partial_markdown)` to publish finished sections while it runs.
+    A running job whose worker has not claimed it or published progress for `stale_s` is taken to
+    belong to a process that died, and is queued again.
+    """
+
+    def __init__(self, path: str, runner, workers: int = 4, max_queued: int = 50,
+                 max_active_per_session: int = 2, keep_s: float = 7 * 86400, poll_s: float = 0.5,
+                 stale_s: float = 600):
+        self.path = path
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_active_per_session = max_active_per_session
+        self.keep_s = keep_s
+        self.poll_s = poll_s
+        self.stale_s = stale_s
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, session TEXT NOT NULL, status TEXT NOT NULL,"
+                " created REAL NOT NULL, started REAL, finished REAL, cache_key TEXT NOT NULL,"
+                " payload TEXT NOT NULL, partial_md TEXT NOT NULL DEFAULT '', markdown TEXT NOT NULL DEFAULT '',"
+                " docx BLOB, error TEXT NOT NULL DEFAULT '')"
+            )
+            columns = {r[1] for r in db.execute("PRAGMA table_info(jobs)")}
+            if "usage" not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN usage TEXT NOT NULL DEFAULT '{}'")
+            if "heartbeat" not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs(session, started)")
+        self._threads = [threading.Thread(target=self._work, name=f"review-worker-{i}", daemon=True) for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # ---------- submitting & polling ----------
+    def submit(self, session: str, cache_key: str, payload: dict) -> str:
+        """Queue a review and return its job id (or the id of an identical job still in flight)."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT id FROM jobs WHERE cache_key = ? AND status IN ('queued', 'running') ORDER BY created LIMIT 1",
+                    (cache_key,),
+                ).fetchone()
+                if row:
+                    db.execute("COMMIT")
+                    return row[0]
+                queued = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= self.max_queued:
+                    raise QueueFull("The review queue is full right now. Please try again in a few minutes.")
+                active = db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE session = ? AND status IN ('queued', 'running')", (session,)
+                ).fetchone()[0]
+                if active >= self.max_active_per_session:
+                    raise QueueFull("You already have reviews in progress. Please wait for one to finish.")
+                job_id = uuid.uuid4().hex
+                db.execute(
+                    "INSERT INTO jobs(id, session, status, created, cache_key, payload) VALUES (?, ?, 'queued', ?, ?, ?)",
+                    (job_id, session, now, cache_key, json.dumps(payload, ensure_ascii=False)),
+                )
+                db.execute("DELETE FROM jobs WHERE status IN ('done', 'error') AND finished < ?", (now - self.keep_s,))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: str) -> Job | None:
+        with self._connect() as db:
+            return self._load(db, job_id)
+
+    @staticmethod
+    def _load(db, job_id: str) -> Job | None:
+        row = db.execute(
+            "SELECT id, session, status, created, started, finished, cache_key, payload, partial_md, markdown, docx, error, usage"
+            " FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if not row:
+            return None
+        fields = list(row)
+        fields[7] = json.loads(fields[7])
+        fields[10] = bytes(fields[10]) if fields[10] is not None else None
+        fields[12] = json.loads(fields[12] or "{}")
+        return Job(*fields)
+
+    def position(self, job_id: str) -> int | None:
+        """1-based place in the fair queue order, or None once the job has left the queue."""
+        with self._connect() as db:
+            for pos, (jid, _, _) in enumerate(db.execute(FAIR_ORDER_SQL), start=1):
+                if jid == job_id:
+                    return pos
+        return None
+
+    def stats(self) -> dict:
+        with self._connect() as db:
+            counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {s: counts.get(s, 0) for s in ("queued", "running", "done", "error")}
+
+    # ---------- workers ----------
+    def _claim(self) -> Job | None:
+        # read the job inside the transaction: a job marked running must reach a worker
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            # the process running these died mid-review (other processes sharing the database keep
+            # their jobs' heartbeats fresh): run them again
+            db.execute(
+                "UPDATE jobs SET status = 'queued', started = NULL, heartbeat = NULL, partial_md = ''"
+                " WHERE status = 'running' AND COALESCE(heartbeat, started, 0) < ?",
+                (now - self.stale_s,),
+            )
+            row = db.execute(FAIR_ORDER_SQL + " LIMIT 1").fetchone()
+            job = None
+            if row:
+                db.execute("UPDATE jobs SET status = 'running', started = ?, heartbeat = ? WHERE id = ?", (now, now, row[0]))
+                job = self._load(db, row[0])
+            db.execute("COMMIT")
+        return job
+
+    def _update(self, job_id: str, **fields):
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def _progress(self, job_id: str, partial_md: str):
+        """Publish a running job's finished sections; a failed write only delays them, the review goes on."""
+        try:
+            self._update(job_id, partial_md=partial_md, heartbeat=time.time())
+        except sqlite3.Error:
+            log.exception("review job %s: could not record progress", job_id)
+
+    def _finish(self, job_id: str, **fields):
+        """Record a job's final status, retrying while the database is busy (until stop())."""
+        while True:
+            try:
+                self._update(job_id, finished=time.time(), **fields)
+                return
+            except sqlite3.Error:
+                log.exception("review job %s: could not record status %r, retrying", job_id, fields.get("status"))
+                if self._stopping.wait(self.poll_s):
+                    return  # left 'running'; queued again once stale
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+                if job is None:
+                    self._wake.wait(self.poll_s)
+                    self._wake.clear()
+                    continue
+                try:
+                    markdown, docx, usage = self.runner(job, lambda md, jid=job.id: self._progress(jid, md))
+                    fields = dict(status="done", markdown=markdown, docx=docx, usage=json.dumps(usage))
+                except Exception as e:
+                    fields = dict(status="error", error=str(e) or type(e).__name__)
+                self._finish(job.id, **fields)
+            except Exception:
+                # e.g. "database is locked" past the connect timeout: keep the worker alive
+                log.exception("review worker %s: job queue error, retrying", threading.current_thread().name)
+                self._wake.wait(self.poll_s)
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
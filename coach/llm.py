@@ -0,0 +1,27 @@
+# coach/llm.py
+"""
+Which chat-completions backend reviews are written by, selected with LLM_BACKEND:
+
+- "openai" (default): the OpenAI API (OPENAI_API_KEY; OPENAI_BASE_URL is honoured by the SDK).
+- "mock": any OpenAI-compatible endpoint at LLM_BASE_URL, by default the local stand-in
+  (`python -m coach.stub_openai`) on port 8765; no API key needed.
+- "stub": the same canned answers in-process (coach.stub_openai.StubClient), no server at all.
+"""
+from openai import OpenAI
+
+from coach.stub_openai import StubClient
+
+BACKENDS = ("openai", "mock", "stub")
+MOCK_BASE_URL = "http://127.0.0.1:8765/v1"
+
+
+def make_llm_client(backend: str = "openai", api_key: str | None = None, base_url: str | None = None,
+                    timeout: float = 60.0):
+    """A client whose `chat.completions.create` the review code calls (SDK retries off; see coach.resilience)."""
+    if backend == "openai":
+        return OpenAI(api_key=api_key, base_url=base_url or None, timeout=timeout, max_retries=0)
+    if backend == "mock":
+        return OpenAI(api_key=api_key or "mock", base_url=base_url or MOCK_BASE_URL, timeout=timeout, max_retries=0)
+    if backend == "stub":
+        return StubClient()
+    raise ValueError(f"unknown LLM_BACKEND {backend!r} (expected one of {', '.join(BACKENDS)})")
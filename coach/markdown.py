@@ -0,0 +1,232 @@
+# coach/markdown.py
+"""
+Post-processing of the model's markdown into a typed review tree (section → subsection → lines).
+
+One pass over the completion normalizes headings, drops the advisory footer, fills Missing blocks and
+turns numeric scores into ratings; the Word report and the markdown export both render the tree.
+"""
+import re
+from dataclasses import dataclass, field
+
+from coach.sections import ADVISORY_TEXTS, MAJOR_SECTIONS, SUBS_13, SUBS_14, SUBS_STANDARD, subs_for
+
+SUB_TITLES = set(SUBS_STANDARD + SUBS_13 + SUBS_14)
+MISSING_TEXT = "• Missing/Needs input."
+# Revision mode: first line of each section when the review updates an earlier draft.
+REVISION_NEW = "Revision: New in this draft."
+REVISION_CARRIED = "Revision: Unchanged since the previous draft (feedback carried over)."
+
+# ---------- Score → Rating ----------
+# '• Score: 2/5 — reason' becomes '• Rating: Weak — reason'.
+# Mapping: 0–2 => Weak, 3 => Average, 4–5 => Good. Keeps any trailing reason.
+SCORE_RE = re.compile(
+    r'(?P<lead>[•\-\*]\s*)?score\s*[:\-]?\s*(?P<num>\d+(?:\.\d+)?)\s*/\s*5(?P<tail>\s*(?:[—\-–].*)?)',
+    re.IGNORECASE
+)
+RATING_RE = re.compile(r'(?:[•\-\*]\s*)?rating\s*[:\-]?\s*(?P<label>weak|average|good)\b', re.IGNORECASE)
+
+def score_label(num: float) -> str:
+    if num <= 2:
+        return "Weak"
+    if num < 4:  # i.e., exactly 3
+        return "Average"
+    return "Good"  # 4 or 5+
+
+def convert_score_line(line: str) -> str:
+    m = SCORE_RE.fullmatch(line)
+    if not m:
+        return line
+    return f"{m.group('lead') or ''}Rating: {score_label(float(m.group('num')))}{m.group('tail') or ''}"
+
+# ---------- Review tree ----------
+@dataclass
+class Line:
+    md: str     # the line as written in the markdown
+    kind: str   # "text" | "bullet" | "blank" | "revision"
+    rating: str | None = None  # Weak / Average / Good on a rating line
+
+    @property
+    def text(self) -> str:
+        return self.md[2:].strip() if self.kind == "bullet" else self.md
+
+def make_line(md: str) -> Line:
+    if not md:
+        return Line("", "blank")
+    if md in (REVISION_NEW, REVISION_CARRIED):
+        return Line(md, "revision")
+    m = RATING_RE.match(md)
+    return Line(md, "bullet" if md.startswith(("• ", "- ")) else "text", m.group("label").capitalize() if m else None)
+
+@dataclass
+class Subsection:
+    title: str
+    lines: list[Line] = field(default_factory=list)
+
+@dataclass
+class Section:
+    title: str | None  # None for text before the first heading
+    lines: list[Line] = field(default_factory=list)  # before the first subsection
+    subsections: list[Subsection] = field(default_factory=list)
+    rating: str | None = None
+    missing: bool = False
+    revision: str | None = None  # "new" | "carried" when the review updates an earlier draft
+
+    def md_lines(self, revision: bool = True) -> list[str]:
+        out = [] if self.title is None else ["## " + self.title]
+        out += [ln.md for ln in self.lines if revision or ln.kind != "revision"]
+        for sub in self.subsections:
+            out.append("### " + sub.title)
+            out += [ln.md for ln in sub.lines]
+        return out
+
+    def markdown(self, revision: bool = True) -> str:
+        """The section as markdown; `revision=False` leaves out its revision marker."""
+        return "\n".join(self.md_lines(revision)).strip()
+
+    def mark_revision(self, new: bool):
+        self.lines = [ln for ln in self.lines if ln.kind != "revision"]
+        self.lines.insert(0, make_line(REVISION_NEW if new else REVISION_CARRIED))
+        self.revision = "new" if new else "carried"
+
+@dataclass
+class Review:
+    sections: list[Section] = field(default_factory=list)
+
+    def section(self, title: str) -> Section | None:
+        return next((s for s in self.sections if s.title == title), None)
+
+    def replace_section(self, sec: Section):
+        """Put `sec` in place of the section with its title, or at its template position if absent."""
+        for i, s in enumerate(self.sections):
+            if s.title == sec.title:
+                self.sections[i] = sec
+                return
+        rank = MAJOR_SECTIONS.index(sec.title) if sec.title in MAJOR_SECTIONS else len(MAJOR_SECTIONS)
+        pos = next((i for i, s in enumerate(self.sections)
+                    if s.title in MAJOR_SECTIONS and MAJOR_SECTIONS.index(s.title) > rank), len(self.sections))
+        self.sections.insert(pos, sec)
+
+    def markdown(self) -> str:
+        return "\n".join(ln for s in self.sections for ln in s.md_lines()).strip()
+
+def missing_section(title: str) -> Section:
+    """An empty block: its standard subheadings, each with 'Missing/Needs input.'"""
+    return Section(title, subsections=[Subsection(s, [make_line(MISSING_TEXT)]) for s in subs_for(title)], missing=True)
+
+# ---------- Single-pass parser ----------
+class ReviewParser:
+    """
+    Line-at-a-time state machine from raw completion text to a Review.
+    Blocks listed in `empty_blocks` get their standard subheadings with 'Missing/Needs input.' and
+    whatever the model wrote under them is dropped; if the model did not write them at all (it is
+    only asked for the filled blocks), they are inserted in template order.
+    """
+    def __init__(self, empty_blocks: list[str]):
+        self.empty_blocks = set(empty_blocks)
+        self.review = Review()
+        self._skip = False
+
+    def _fill_missing(self, before: str | None = None):
+        """Add the empty blocks that precede `before` in the template (all of them when None)."""
+        present = {s.title for s in self.review.sections}
+        stop = MAJOR_SECTIONS.index(before) if before in MAJOR_SECTIONS else len(MAJOR_SECTIONS)
+        for t in MAJOR_SECTIONS[:stop]:
+            if t in self.empty_blocks and t not in present:
+                self.review.sections.append(missing_section(t))
+
+    def feed_line(self, raw: str) -> bool:
+        """Add one line; returns True when it starts a new section (so the previous one is complete)."""
+        line = raw.strip()
+        if line in ADVISORY_TEXTS:
+            return False
+        if line in MAJOR_SECTIONS:
+            line = "## " + line
+        elif line in SUB_TITLES:
+            line = "### " + line
+        sections = self.review.sections
+        if line.startswith("## "):
+            title = line[3:].strip()
+            if title in MAJOR_SECTIONS:
+                self._fill_missing(before=title)
+            self._skip = title in self.empty_blocks
+            if self._skip and any(s.title == title for s in sections):
+                return False  # already filled in as Missing
+            sections.append(missing_section(title) if self._skip else Section(title))
+            return len(sections) > 1
+        if self._skip:
+            return False
+        if not sections:
+            if not line:
+                return False  # leading blank lines
+            sections.append(Section(None))
+        sec = sections[-1]
+        if line.startswith("### "):
+            sec.subsections.append(Subsection(line[4:].strip()))
+            return False
+        ln = make_line(convert_score_line(line))
+        (sec.subsections[-1].lines if sec.subsections else sec.lines).append(ln)
+        if ln.rating and not sec.rating:
+            sec.rating = ln.rating
+        if ln.kind == "revision":
+            sec.revision = "new" if ln.md == REVISION_NEW else "carried"
+        return False
+
+    def close(self) -> Review:
+        """Drop trailing blank lines, add any empty blocks still missing, and return the finished tree."""
+        if self.review.sections:
+            sec = self.review.sections[-1]
+            lines = sec.subsections[-1].lines if sec.subsections else sec.lines
+            while lines and lines[-1].kind == "blank":
+                lines.pop()
+        self._fill_missing()
+        return self.review
+
+def parse_review(raw_md: str, empty_blocks: list[str]) -> Review:
+    parser = ReviewParser(empty_blocks)
+    for line in raw_md.splitlines():
+        parser.feed_line(line)
+    return parser.close()
+
+def postprocess_markdown(raw_md: str, empty_blocks: list[str]) -> str:
+    return parse_review(raw_md, empty_blocks).markdown()
+
+class SectionStream:
+    """
+    Incremental post-processor for a streamed completion.
+    Lines go through the same ReviewParser as a full pass; a section is finished (and shown) once the
+    next '## N) ...' heading (with or without the '##') arrives.
+    """
+    def __init__(self, empty_blocks: list[str]):
+        self.parser = ReviewParser(empty_blocks)
+        self._pending = ""
+        self._closed = False
+
+    def feed(self, text: str) -> bool:
+        """Add streamed text; returns True when at least one section was finalized."""
+        *complete_lines, self._pending = (self._pending + text).split("\n")
+        done = False
+        for ln in complete_lines:
+            done = self.parser.feed_line(ln) or done
+        return done
+
+    def close(self) -> str:
+        """Flush the last section and return the final markdown."""
+        if self._pending:
+            self.parser.feed_line(self._pending); self._pending = ""
+        self.parser.close()
+        self._closed = True
+        return self.markdown
+
+    @property
+    def review(self) -> Review:
+        return self.parser.review
+
+    @property
+    def sections(self) -> list[Section]:
+        """Finished sections (all of them once closed)."""
+        secs = self.parser.review.sections
+        return secs if self._closed else secs[:-1]
+
+    @property
+    def markdown(self) -> str:
+        return "\n\n".join(md for md in (s.markdown() for s in self.sections) if md)
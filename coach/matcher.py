@@ -0,0 +1,66 @@
+# coach/matcher.py
+"""Multi-phrase substring matching compiled into one regex, for label and hint detection."""
+import re
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a character trie: shared prefixes are matched once, longer phrases win at a position."""
+    alts = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not alts:
+        return ""
+    body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+    return "(?:" + body + ")?" if "" in node else body
+
+
+class PhraseMatcher:
+    """
+    Finds which of many phrases occur anywhere in a string, with one scan of the string.
+
+    Phrases are folded into a prefix trie and compiled once into a single regex, so the work per
+    character depends on the text, not on how many phrases there are. `phrases` is in priority
+    order: `first()` returns the index of the highest-priority phrase that occurs, however far into
+    the text it is (the same answer as `next(i for i, p in enumerate(phrases) if p in text)`).
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(dict.fromkeys(p for p in phrases if p))
+        trie: dict = {}
+        for p in self.phrases:
+            node = trie
+            for ch in p:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        rank = {p: i for i, p in enumerate(self.phrases)}
+        # the regex reports the longest phrase at each position; every phrase that is a prefix of it
+        # occurs there too, so keep the best rank along the path
+        self._best = {}
+        for p in self.phrases:
+            best, node = len(self.phrases), trie
+            for i, ch in enumerate(p, start=1):
+                node = node[ch]
+                if "" in node:
+                    best = min(best, rank[p[:i]])
+            self._best[p] = best
+        pattern = _trie_pattern(trie)
+        self._find = re.compile("(?=(" + pattern + "))").finditer if pattern else None
+        self._search = re.compile(pattern).search if pattern else None
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def first(self, text: str) -> int | None:
+        """Index (priority) of the best phrase occurring in `text`, or None."""
+        if not self._find:
+            return None
+        best = None
+        for m in self._find(text):
+            r = self._best[m.group(1)]
+            if best is None or r < best:
+                best = r
+                if r == 0:
+                    break
+        return best
+
+    def search(self, text: str) -> bool:
+        """True if any phrase occurs in `text`."""
+        return bool(self._search and self._search(text))
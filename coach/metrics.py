@@ -0,0 +1,201 @@
+# coach/metrics.py
+"""
+Review instrumentation: timing spans per phase, tokens, estimated cost, output size.
+
+Every trace is appended as one JSON line to a local metrics log (the source of truth, safe to ship or
+tail). Latency histograms per stage are kept in memory, rebuilt from the log at startup, and
+exported in Prometheus text format to `<log>.prom` after each record (for node_exporter's textfile
+collector or any scraper that reads files).
+
+    python -m coach.metrics .cache/metrics.jsonl     # p50/p95 per stage and cost per model
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# USD per 1M tokens: (input, cached input, output). Estimates only; update when prices change.
+PRICES_PER_MTOK = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+SAMPLES_PER_STAGE = 5000  # recent spans kept for percentiles
+
+
+def price_for(model: str) -> tuple[float, float, float]:
+    """Prices for a model name, including dated snapshots ('gpt-4o-mini-2024-07-18' → gpt-4o-mini)."""
+    if model in PRICES_PER_MTOK:
+        return PRICES_PER_MTOK[model]
+    base = max((m for m in PRICES_PER_MTOK if model.startswith(m + "-")), key=len, default=None)
+    return PRICES_PER_MTOK[base] if base else (0.0, 0.0, 0.0)
+
+
+def estimate_cost(model: str, usage: dict) -> float:
+    """
+    Estimated USD for one review's token usage (0.0 for models without a price). When usage is split
+    per answering model (`usage["models"]`), each part is priced for its own model.
+    """
+    if usage.get("models"):
+        return sum(estimate_cost(m, part) for m, part in usage["models"].items())
+    price_in, price_cached, price_out = price_for(model)
+    cached = usage.get("cached_tokens", 0) or 0
+    fresh = (usage.get("prompt_tokens", 0) or 0) - cached
+    return (fresh * price_in + cached * price_cached + (usage.get("completion_tokens", 0) or 0) * price_out) / 1e6
+
+
+class Trace:
+    """Spans (seconds, summed per name) and fields for one upload or review."""
+
+    def __init__(self, event: str, **fields):
+        self.event = event
+        self.fields = dict(fields)
+        self.spans: dict[str, float] = {}
+        self.ts = time.time()
+
+    @contextmanager
+    def span(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + max(0.0, seconds)
+
+    def as_record(self) -> dict:
+        return {"ts": round(self.ts, 3), "event": self.event, **self.fields,
+                "spans": {k: round(v, 6) for k, v in self.spans.items()}}
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+class MetricsLog:
+    """Append-only JSONL metrics log plus in-memory aggregates (thread-safe)."""
+
+    def __init__(self, path: str, write_prom: bool = True):
+        self.path = path
+        self.prom_path = os.path.splitext(path)[0] + ".prom" if write_prom else None
+        self._lock = threading.Lock()
+        self._buckets: dict[str, list[int]] = defaultdict(lambda: [0] * len(BUCKETS_S))
+        self._count: dict[str, int] = defaultdict(int)
+        self._sum: dict[str, float] = defaultdict(float)
+        self._recent: dict[str, deque] = defaultdict(lambda: deque(maxlen=SAMPLES_PER_STAGE))
+        self._tokens: dict[tuple, int] = defaultdict(int)
+        self._cost: dict[str, float] = defaultdict(float)
+        self._events: dict[tuple, int] = defaultdict(int)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._observe(json.loads(line))
+                    except ValueError:
+                        continue  # torn last line from a crash
+
+    def _observe(self, rec: dict):
+        for stage, s in (rec.get("spans") or {}).items():
+            self._count[stage] += 1
+            self._sum[stage] += s
+            self._recent[stage].append(s)
+            buckets = self._buckets[stage]
+            for i, le in enumerate(BUCKETS_S):
+                if s <= le:
+                    buckets[i] += 1
+        model = rec.get("model") or ""
+        self._events[(rec.get("event") or "", rec.get("status") or "", model)] += 1
+        for kind in ("prompt_tokens", "cached_tokens", "completion_tokens"):
+            if rec.get(kind):
+                self._tokens[(model, kind)] += rec[kind]
+        if rec.get("cost_usd"):
+            self._cost[model] += rec["cost_usd"]
+
+    def record(self, trace: Trace) -> dict:
+        rec = trace.as_record()
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._observe(rec)
+            if self.prom_path:
+                tmp = self.prom_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self._prometheus_text())
+                os.replace(tmp, self.prom_path)
+        return rec
+
+    # ---------- views ----------
+    def stage_percentiles(self) -> list[dict]:
+        """Per stage: samples, p50 and p95 (seconds) over the most recent spans."""
+        with self._lock:
+            recent = {k: sorted(v) for k, v in self._recent.items()}
+        return [{"stage": k, "n": len(v), "p50_s": percentile(v, 0.50), "p95_s": percentile(v, 0.95)} for k, v in recent.items()]
+
+    def cost_by_model(self) -> list[dict]:
+        with self._lock:
+            models = sorted({m for (e, _, m) in self._events if e == "review"})
+            return [{
+                "model": m,
+                "reviews": sum(n for (e, s, mm), n in self._events.items() if e == "review" and s == "done" and mm == m),
+                "errors": sum(n for (e, s, mm), n in self._events.items() if e == "review" and s == "error" and mm == m),
+                "prompt_tokens": self._tokens[(m, "prompt_tokens")],
+                "cached_tokens": self._tokens[(m, "cached_tokens")],
+                "completion_tokens": self._tokens[(m, "completion_tokens")],
+                "cost_usd": round(self._cost[m], 4),
+            } for m in models]
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self) -> str:
+        out = [
+            "# HELP sinapis_review_stage_seconds Time spent in each phase of a review.",
+            "# TYPE sinapis_review_stage_seconds histogram",
+        ]
+        for stage in sorted(self._count):
+            for le, n in zip(BUCKETS_S, self._buckets[stage]):
+                out.append(f'sinapis_review_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {n}')
+            out.append(f'sinapis_review_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {self._count[stage]}')
+            out.append(f'sinapis_review_stage_seconds_sum{{stage="{stage}"}} {self._sum[stage]:.6f}')
+            out.append(f'sinapis_review_stage_seconds_count{{stage="{stage}"}} {self._count[stage]}')
+        out += ["# HELP sinapis_events_total Uploads and reviews by outcome.", "# TYPE sinapis_events_total counter"]
+        for (event, status, model), n in sorted(self._events.items()):
+            out.append(f'sinapis_events_total{{event="{event}",status="{status}",model="{model}"}} {n}')
+        out += ["# HELP sinapis_review_tokens_total Tokens reported by the API.", "# TYPE sinapis_review_tokens_total counter"]
+        for (model, kind), n in sorted(self._tokens.items()):
+            out.append(f'sinapis_review_tokens_total{{model="{model}",kind="{kind.removesuffix("_tokens")}"}} {n}')
+        out += ["# HELP sinapis_review_cost_usd_total Estimated spend.", "# TYPE sinapis_review_cost_usd_total counter"]
+        for model, cost in sorted(self._cost.items()):
+            out.append(f'sinapis_review_cost_usd_total{{model="{model}"}} {cost:.6f}')
+        return "\n".join(out) + "\n"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Summarize a review metrics log.")
+    ap.add_argument("log", help="metrics .jsonl file")
+    ap.add_argument("--prom", action="store_true", help="print the Prometheus text export instead")
+    args = ap.parse_args(argv)
+    m = MetricsLog(args.log, write_prom=False)
+    if args.prom:
+        print(m.prometheus_text(), end="")
+        return
+    print(f"{'stage':<14}{'n':>7}{'p50 s':>10}{'p95 s':>10}")
+    for row in m.stage_percentiles():
+        print(f"{row['stage']:<14}{row['n']:>7}{row['p50_s']:>10.3f}{row['p95_s']:>10.3f}")
+    print(f"\n{'model':<14}{'reviews':>8}{'errors':>8}{'prompt tok':>12}{'compl tok':>11}{'cost USD':>10}")
+    for row in m.cost_by_model():
+        print(f"{row['model']:<14}{row['reviews']:>8}{row['errors']:>8}{row['prompt_tokens']:>12}{row['completion_tokens']:>11}{row['cost_usd']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
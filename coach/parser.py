@@ -0,0 +1,269 @@
+# coach/parser.py
+"""Founder .docx submission → normalized payload dict (one entry per canvas field)."""
+import posixpath
+import re
+import zipfile
+from io import BytesIO
+from xml.etree import ElementTree as ET
+
+from coach.matcher import PhraseMatcher
+
+# ---------- Label helpers & parser ----------
+def normalize_label(s: str) -> str:
+    if not s: return ""
+    s = s.strip()
+    s = re.sub(r"^\s*\d+\s*[\.\)\-:]?\s*", "", s)  # drop "1.", "1)", etc.
+    s = s.rstrip(":").strip().lower()
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+FIELD_ALIASES = {
+    "business_name": ["business name"],
+    "brief_description": ["brief description of business", "brief description"],
+    "problem": ["problem","1) problem","1. problem"],
+    "value_proposition": ["value proposition","2) value proposition","2. value proposition"],
+    "unfair_advantage": ["unfair advantage","3) unfair advantage","3. unfair advantage"],
+    "customer_segments": ["customer segments","4) customer segments","4. customer segments"],
+    "channels": ["channels","5) channels","5. channels"],
+    "customer_relationships": ["customer relationships","6) customer relationships","6. customer relationships"],
+    "key_activities": ["key activities","7) key activities","7. key activities"],
+    "key_resources": ["key resources","8) key resources","8. key resources"],
+    "key_partners": ["key partners","9) key partners","9. key partners"],
+    "revenue_streams": ["revenue streams","10) revenue streams","10. revenue streams"],
+    "cost_structure": ["cost structure","11) cost structure","11. cost structure"],
+    "kingdom_impact": ["kingdom impact","12) kingdom impact","12. kingdom impact"],
+}
+ALIAS_TO_KEY = {normalize_label(a): k for k, arr in FIELD_ALIASES.items() for a in arr}
+
+BASE_PHRASE = {
+    "business_name": "business name",
+    "brief_description": "brief description",
+    "problem": "problem",
+    "value_proposition": "value proposition",
+    "unfair_advantage": "unfair advantage",
+    "customer_segments": "customer segments",
+    "channels": "channels",
+    "customer_relationships": "customer relationships",
+    "key_activities": "key activities",
+    "key_resources": "key resources",
+    "key_partners": "key partners",
+    "revenue_streams": "revenue streams",
+    "cost_structure": "cost structure",
+    "kingdom_impact": "kingdom impact",
+}
+
+HINT_SNIPPETS = [
+    "provide a brief description",
+    "what customer problem",
+    "what are you offering",
+    "what is your uniqueness",
+    "which customer groups",
+    "through what means do you reach",
+    "what type of relationship",
+    "what tasks are vital",
+    "what assets are essential",
+    "which external organizations",
+    "how does your business earn revenue",
+    "what are the defining characteristics of your cost structure",
+    "where and how are you intentionally looking to make impact",
+]
+
+class LabelSet:
+    """
+    Canvas labels and template hint text for one family of templates, compiled once.
+
+    `aliases` maps field key → exact label spellings, `phrases` maps field key → phrase(s) that
+    identify the field anywhere in a label line, and `hints` are the template's instruction lines to
+    drop from answers. Templates in other languages (e.g. Swahili, French) add their own sets with
+    `extend()`; matching cost does not grow with the number of phrases.
+    """
+
+    def __init__(self, aliases: dict, phrases: dict, hints):
+        self.aliases = {k: list(v) for k, v in aliases.items()}
+        self.phrases = {k: [v] if isinstance(v, str) else list(v) for k, v in phrases.items()}
+        self.hints = list(hints)
+        self.alias_to_key = {normalize_label(a): k for k, arr in self.aliases.items() for a in arr}
+        phrase_key = {}
+        for k, arr in self.phrases.items():
+            for p in arr:
+                phrase_key.setdefault(p, k)  # a phrase shared by two fields goes to the first
+        self._phrase_matcher = PhraseMatcher(phrase_key)
+        self._phrase_keys = [phrase_key[p] for p in self._phrase_matcher.phrases]
+        self._hint_matcher = PhraseMatcher(h.lower() for h in self.hints)
+
+    def extend(self, aliases: dict | None = None, phrases: dict | None = None, hints=()) -> "LabelSet":
+        """A new set with extra aliases/phrases/hints (existing ones keep priority)."""
+        merged_aliases = {k: list(v) for k, v in self.aliases.items()}
+        for k, arr in (aliases or {}).items():
+            merged_aliases.setdefault(k, []).extend(arr)
+        merged_phrases = {k: list(v) for k, v in self.phrases.items()}
+        for k, arr in (phrases or {}).items():
+            merged_phrases.setdefault(k, []).extend([arr] if isinstance(arr, str) else arr)
+        return LabelSet(merged_aliases, merged_phrases, self.hints + list(hints))
+
+    def key_for_label(self, left_text: str):
+        """Field key for a left cell that may hold a label + hint on several lines (one pass over the lines)."""
+        fuzzy = None
+        for raw in (left_text or "").splitlines():
+            ln = normalize_label(raw)
+            if not ln: continue
+            if ln in self.alias_to_key:  # 1) exact alias match on any line
+                return self.alias_to_key[ln]
+            if fuzzy is None:  # 2) base phrase anywhere on the earliest line that has one
+                hit = self._phrase_matcher.first(ln)
+                if hit is not None:
+                    fuzzy = self._phrase_keys[hit]
+        return fuzzy
+
+    def is_hint(self, line: str) -> bool:
+        return self._hint_matcher.search(line.lower())
+
+    def clean_value(self, text: str) -> str:
+        """Answer text without blank lines or template hint lines."""
+        out = []
+        for ln in (text or "").splitlines():
+            ln = ln.strip()
+            if ln and not self.is_hint(ln):
+                out.append(ln)
+        return "\n".join(out).strip()
+
+LABELS = LabelSet(FIELD_ALIASES, BASE_PHRASE, HINT_SNIPPETS)
+
+def guess_key_from_label_cell(left_text: str):
+    """Find the correct field key from a left-cell that may include a label + hint on multiple lines."""
+    return LABELS.key_for_label(left_text)
+
+def clean_value(text: str) -> str:
+    return LABELS.clean_value(text)
+
+# ---------- Streaming .docx reader ----------
+# Only the main document part is read from the zip (media and other parts are never decompressed),
+# and it is walked once with iterparse. Text follows python-docx's rules: a cell is the "\n"-joined
+# text of its own paragraphs, a paragraph is its runs plus hyperlink runs, and horizontally or
+# vertically merged cells repeat the text of the cell they merge into.
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+REL_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+CT_DOCUMENT_MAIN = "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+
+_BR_TYPE = W + "type"
+_RUN_TEXT = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+def _run_text(r) -> str:
+    out = []
+    for e in r:
+        if e.tag == W + "t":
+            out.append(e.text or "")
+        elif e.tag == W + "br":
+            out.append("\n" if e.get(_BR_TYPE, "textWrapping") == "textWrapping" else "")
+        else:
+            out.append(_RUN_TEXT.get(e.tag, ""))
+    return "".join(out)
+
+def _paragraph_text(p) -> str:
+    out = []
+    for e in p:
+        if e.tag == W + "r":
+            out.append(_run_text(e))
+        elif e.tag == W + "hyperlink":
+            out.extend(_run_text(r) for r in e if r.tag == W + "r")
+    return "".join(out)
+
+def _int_val(parent, path: str, default: int) -> int:
+    e = parent.find(path) if parent is not None else None
+    return int(e.get(W + "val")) if e is not None else default
+
+def _row_cells(tr, above: dict | None) -> tuple[list[str], dict]:
+    """Cell texts of one row, grid cells included (like python-docx's `row.cells`), plus the
+    offset → texts map the next row needs to resolve vertical merges."""
+    cells, layout = [], {}
+    offset = _int_val(tr.find(W + "trPr"), W + "gridBefore", 0)
+    for tc in tr.iterfind(W + "tc"):
+        tcPr = tc.find(W + "tcPr")
+        span = _int_val(tcPr, W + "gridSpan", 1)
+        vmerge = tcPr.find(W + "vMerge") if tcPr is not None else None
+        if vmerge is not None and vmerge.get(W + "val", "continue") == "continue":
+            if above is None or offset not in above:
+                raise ValueError(f"no `tc` element at grid_offset={offset}")
+            texts = above[offset]
+        else:
+            texts = ["\n".join(_paragraph_text(p) for p in tc.iterfind(W + "p"))] * span
+        layout[offset] = texts
+        cells.extend(texts)
+        offset += span
+    return cells, layout
+
+def main_document_part(zf: zipfile.ZipFile) -> str:
+    """Zip member name of the main document part, found the same way Word (and python-docx) do."""
+    name = "word/document.xml"
+    try:
+        rels = ET.fromstring(zf.read("_rels/.rels"))
+        for rel in rels:
+            if rel.get("Type") == REL_OFFICE_DOCUMENT and rel.get("TargetMode") != "External":
+                name = posixpath.normpath(rel.get("Target", name).lstrip("/"))
+                break
+    except KeyError:
+        pass
+    content_type = None
+    try:
+        types = ET.fromstring(zf.read("[Content_Types].xml"))
+        ns = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+        for e in types.iterfind(ns + "Override"):
+            if e.get("PartName", "").lstrip("/").lower() == name.lower():
+                content_type = e.get("ContentType")
+        if content_type is None:
+            ext = posixpath.splitext(name)[1].lstrip(".").lower()
+            content_type = next((e.get("ContentType") for e in types.iterfind(ns + "Default") if e.get("Extension", "").lower() == ext), None)
+    except KeyError:
+        pass
+    if content_type != CT_DOCUMENT_MAIN:
+        raise ValueError(f"file is not a Word file, content type is '{content_type}'")
+    return name
+
+def parse_docx_to_payload(doc, labels: LabelSet = LABELS) -> dict:
+    """
+    Parse either two-column tables (Section | Your Input) or our heading-style template.
+    `doc` is the .docx as bytes or a binary file object (e.g. the Streamlit upload); `labels` picks
+    the template language's aliases and hint text.
+    """
+    src = BytesIO(doc) if isinstance(doc, (bytes, bytearray)) else doc
+    table_buf = {k: "" for k in FIELD_ALIASES.keys()}
+    heading_buf = {k: "" for k in FIELD_ALIASES.keys()}
+    saw_nonempty = False
+    current_key = None
+    with zipfile.ZipFile(src) as zf, zf.open(main_document_part(zf)) as part:
+        depth, body, tbl, above = 0, None, None, None
+        for event, el in ET.iterparse(part, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 2 and el.tag == W + "body":
+                    body = el
+                elif depth == 3 and el.tag == W + "tbl" and body is not None:
+                    tbl, above = el, None
+                continue
+            depth -= 1
+            # A) two-column tables (works with labels+hints in the left cell)
+            if depth == 3 and tbl is not None and el.tag == W + "tr":
+                cells, above = _row_cells(el, above)
+                tbl.remove(el)
+                if len(cells) < 2: continue
+                key = labels.key_for_label(cells[0])
+                val = labels.clean_value(cells[1])
+                if key and val:
+                    table_buf[key] = val
+                    saw_nonempty = True
+            elif depth == 2 and body is not None:
+                # B) heading-style paragraphs (our template), used when no table row matched
+                if el.tag == W + "p" and not saw_nonempty:
+                    t = _paragraph_text(el).strip()
+                    if t:
+                        norm = normalize_label(t)
+                        if norm in labels.alias_to_key:
+                            current_key = labels.alias_to_key[norm]
+                        elif current_key:
+                            val = labels.clean_value(t)
+                            if val:
+                                heading_buf[current_key] = (heading_buf[current_key] + "\n" + val).strip()
+                elif el.tag == W + "tbl":
+                    tbl = None
+                body.remove(el)
+    return table_buf if saw_nonempty else heading_buf
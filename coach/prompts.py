@@ -0,0 +1,298 @@
+# coach/prompts.py
+"""System prompts, the response template, optional guides and message assembly."""
+import hashlib
+import json
+import os
+import textwrap
+from dataclasses import dataclass
+from functools import lru_cache
+
+from coach.resources import load_if_changed, read_text
+from coach.sections import MAJOR_SECTIONS, SYNTHESIS_SECTIONS, subs_for
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ---------- Prompts ----------
+SINAPIS_COACH_SYS = textwrap.dedent("""
+You are **Sinapis AI Coach**, reviewing founder submissions using the Sinapis Ascent Business Model Canvas.
+Audience: post-revenue SMEs in frontier markets (Kenya first).
+Method: Osterwalder BMC + Lean Canvas emphasis + Sinapis Kingdom Impact lens.
+Tone: encouraging, direct critique; diagnostic + light prescriptive.
+NEVER invent content for missing blocks; mark “Missing/Needs input.”
+""").strip()
+
+MARKDOWN_INSTRUCTION = (
+    "Return the assessment as Markdown. "
+    "Use '##' for major sections (1) Problem … 14) Final Assessment). "
+    "Use '###' for subheadings (Strengths, Weaknesses, Probing Questions, Suggested Explorations; "
+    "and under Final Assessment: Quick Wins, Deeper Strategic Questions, Overall Cohesiveness). "
+    "Use bullet lists for items under each subheading. Do not use bold for subheadings."
+)
+
+STRICT_NO_INVENTION = (
+    "CRITICAL: Base the assessment ONLY on the JSON fields provided. "
+    "For ANY block whose input is empty/whitespace, mark the block as Missing/Needs input. "
+    "Under each of its subheadings, output a single bullet: 'Missing/Needs input.' "
+    "Do NOT infer or fabricate. This review is stateless and only for this submission."
+)
+
+# --- Depth-by-default (no toggle) ---
+DEPTH_MIN_COUNTS = {"Strengths": 4, "Weaknesses": 6, "Probing Questions": 10, "Suggested Explorations": 8}
+
+KENYA_LENS = """
+Contextualize critiques for Kenya/East Africa where relevant:
+- Mobile money (e.g., M-Pesa), agent networks, last-mile logistics, power/connectivity reliability.
+- Seasonality (agri, school terms), cash cycle & working capital constraints, FX risk, import duties/customs.
+- County-level regulation & permits, KEBS/product standards, data privacy basics.
+"""
+
+# NOTE: changed to qualitative Rating (Weak/Average/Good) instead of numeric score
+DEPTH_INSTRUCTION = f"""
+Depth Mode (default) — Be rigorous and specific while staying diagnostic (no company-specific step-by-step).
+For each major section:
+- Begin with a compact 'Rating: Weak/Average/Good' (no numeric score) + 1-line reason.
+- **Strengths**: ≥ {DEPTH_MIN_COUNTS['Strengths']} bullets spanning: Market, Customer, Competition, Ops, Finance, Impact, Team/Governance.
+- **Weaknesses**: ≥ {DEPTH_MIN_COUNTS['Weaknesses']} bullets; call out evidence gaps/assumptions.
+- **Probing Questions**: ≥ {DEPTH_MIN_COUNTS['Probing Questions']} bullets; cover Market, Customer, Competition, Ops, Finance/Unit economics, Impact/ESG, Legal/Regulatory, Distribution.
+- **Suggested Explorations**: ≥ {DEPTH_MIN_COUNTS['Suggested Explorations']} bullets; use experiment categories (smoke test, concierge/pilot, pricing, channel trial, churn interview, service blueprint, instrumentation).
+If a block is empty, keep only 'Missing/Needs input.' as required by the strict rule.
+"""
+
+CONSISTENCY_MATRIX = """
+Include cross-check bullets where relevant:
+- Value↔Segment fit, Segment↔Channels reach/cost, Costs↔Revenue seasonality/cash cycle, Activities↔Resources & Partners.
+If numbers are missing for unit economics, state the exact numbers required (price, gross margin %, CAC, churn %, payback).
+"""
+
+# Response template constant
+SINAPIS_RESPONSE_TEMPLATE = textwrap.dedent("""
+Use exactly these headings and order:
+
+1) Problem
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+2) Value Proposition
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+3) Unfair Advantage
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+4) Customer Segments
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+5) Channels
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+6) Customer Relationships
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+7) Key Activities
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+8) Key Resources
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+9) Key Partners
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+10) Revenue Streams
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+11) Cost Structure
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+12) Kingdom Impact
+   Strengths
+   Weaknesses
+   Probing Questions
+   Suggested Explorations
+
+13) Cross-Block Observations
+   Inconsistencies
+   Opportunities to Strengthen
+
+14) Final Assessment
+   Quick Wins
+   Deeper Strategic Questions
+   Overall Cohesiveness
+
+Footer: Advisory—Not Legal/Financial Advice.
+""").strip()
+
+# --- Optional: load rubric/workbook guides from guides/ if present ---
+# Read once per process and again only when the file changes on disk.
+RUBRIC_PATH = os.path.join("guides", "sinapis_rubric.md")
+WORKBOOK_PATH = os.path.join("guides", "sinapis_workbook.md")
+GUIDE_TOKEN_BUDGET = 3000  # rubric + workbook excerpts sent with one call
+
+def read_guide_if_exists(rel_path: str) -> str:
+    return load_if_changed(os.path.join(BASE_DIR, rel_path), read_text, default="")
+
+def rubric_guide() -> str:
+    return read_guide_if_exists(RUBRIC_PATH)
+
+def workbook_guide() -> str:
+    return read_guide_if_exists(WORKBOOK_PATH)
+
+# ---------- Token counting ----------
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")  # gpt-4o / gpt-4o-mini
+    except Exception:
+        return None  # not installed, or its vocabulary can't be fetched (offline)
+
+def count_tokens(text: str) -> int:
+    """Tokens as the model counts them (tiktoken), or ~4 characters per token without it."""
+    enc = _encoding()
+    return len(enc.encode(text, disallowed_special=())) if enc is not None else (len(text) + 3) // 4
+
+# ---------- Guide chunks ----------
+# Guides are split at their '## ' headings. A chunk belongs to a major section when its heading names
+# it ('## 3) Unfair Advantage', '## Unfair Advantage — Founder Prompts', '## Cross-Block Checks',
+# '## Final Assessment Hints'); other chunks (the preamble, '## Experiments …') are general.
+@dataclass(frozen=True)
+class GuideChunk:
+    section: str | None  # major section title, or None for general guidance
+    text: str
+    tokens: int
+
+def chunk_section(heading: str) -> str | None:
+    h = heading.lstrip("#").strip()
+    names = {t.split(") ", 1)[1]: t for t in MAJOR_SECTIONS}
+    num = h.split(")", 1)[0]
+    if num.isdigit() and 1 <= int(num) <= len(MAJOR_SECTIONS):
+        return MAJOR_SECTIONS[int(num) - 1]
+    for name in sorted(names, key=len, reverse=True):
+        if h.startswith(name):
+            return names[name]
+    first = h.split()[0] if h.split() else ""
+    return next((t for t in SYNTHESIS_SECTIONS if t.split(") ", 1)[1].split()[0] == first), None)
+
+@lru_cache(maxsize=8)
+def guide_chunks(text: str) -> tuple[GuideChunk, ...]:
+    parts: list[list[str]] = [[]]
+    for line in text.splitlines():
+        if line.startswith("## "):
+            parts.append([])
+        parts[-1].append(line)
+    chunks = []
+    for lines in parts:
+        body = "\n".join(lines).strip()
+        if body:
+            section = chunk_section(lines[0]) if lines[0].startswith("## ") else None
+            chunks.append(GuideChunk(section, body, count_tokens(body)))
+    return tuple(chunks)
+
+def select_chunks(guides: list[tuple[GuideChunk, ...]], sections: tuple[str, ...], budget: int) -> list[list[GuideChunk]]:
+    """
+    Chunks for `sections` plus the general ones, within `budget` tokens over all guides. Priority: each
+    guide's preamble, then the sections in template order (rubric before workbook), then other general
+    chunks; a chunk that does not fit is left out whole (never cut mid-section).
+    """
+    wanted = set(sections)
+    ranked = []
+    for g, chunks in enumerate(guides):
+        for i, c in enumerate(chunks):
+            if c.section is None:
+                ranked.append(((0, 0) if i == 0 else (2, i), g, i))
+            elif c.section in wanted:
+                ranked.append(((1, MAJOR_SECTIONS.index(c.section)), g, i))
+    chosen, used = set(), 0
+    for _, g, i in sorted(ranked):
+        if used + guides[g][i].tokens <= budget:
+            chosen.add((g, i)); used += guides[g][i].tokens
+    return [[c for i, c in enumerate(chunks) if (g, i) in chosen] for g, chunks in enumerate(guides)]
+
+@lru_cache(maxsize=256)
+def build_guide_messages(rubric: str, workbook: str, sections: tuple[str, ...], budget: int) -> tuple[dict, ...]:
+    rubric_part, workbook_part = select_chunks([guide_chunks(rubric), guide_chunks(workbook)], sections, budget)
+    return (
+        # guides keep their slot even when missing, so the layout never shifts between deployments
+        {"role": "system", "content": "Sinapis Internal Rubric (excerpt):\n" + ("\n\n".join(c.text for c in rubric_part) or "(not available)")},
+        {"role": "system", "content": "Sinapis Workbook Notes (excerpt):\n" + ("\n\n".join(c.text for c in workbook_part) or "(not available)")},
+    )
+
+def guide_messages(sections=MAJOR_SECTIONS, budget: int = GUIDE_TOKEN_BUDGET) -> tuple[dict, ...]:
+    """Rubric and workbook excerpts for the sections a call writes."""
+    return build_guide_messages(rubric_guide(), workbook_guide(), tuple(sections), budget)
+
+# ---------- Message assembly ----------
+# Everything that is the same for every review forms one byte-stable prefix, always in this order:
+# coach persona, instructions, response template. The founder JSON follows in its own user message,
+# then the guide excerpts for the sections being written, then the per-call task (section scope).
+# The static prefix alone (~1k tokens) is too short for provider-side prompt caching (1024-token
+# minimum), but prefix + founder JSON is shared by every call for one submission (fan-out blocks,
+# synthesis, repairs, retries), whatever guide excerpts each call gets.
+@lru_cache(maxsize=1)
+def build_prefix_messages() -> tuple[dict, ...]:
+    return (
+        {"role": "system", "content": SINAPIS_COACH_SYS},
+        {"role": "system", "content": MARKDOWN_INSTRUCTION},
+        {"role": "system", "content": STRICT_NO_INVENTION},
+        {"role": "system", "content": DEPTH_INSTRUCTION},
+        {"role": "system", "content": KENYA_LENS},
+        {"role": "system", "content": CONSISTENCY_MATRIX},
+        {"role": "system", "content": "Response Template:\n" + SINAPIS_RESPONSE_TEMPLATE},
+    )
+
+def prefix_messages() -> tuple[dict, ...]:
+    """The precompiled static prefix."""
+    return build_prefix_messages()
+
+@lru_cache(maxsize=4)
+def _fingerprint(rubric: str, workbook: str) -> str:
+    blob = json.dumps([build_prefix_messages(), rubric, workbook, GUIDE_TOKEN_BUDGET], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:12]
+
+def prefix_fingerprint() -> str:
+    """Short hash of the prompts and guides; changes only when a prompt or guide changes."""
+    return _fingerprint(rubric_guide(), workbook_guide())
+
+@lru_cache(maxsize=64)
+def _excerpts_fingerprint(rubric: str, workbook: str, scopes: tuple[tuple[str, ...], ...], budget: int) -> str:
+    blob = json.dumps([build_guide_messages(rubric, workbook, s, budget) for s in scopes], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def excerpts_fingerprint(scopes) -> str:
+    """Hash of the guide excerpts sent to calls writing each of `scopes` (lists of section titles)."""
+    return _excerpts_fingerprint(rubric_guide(), workbook_guide(), tuple(map(tuple, scopes)), GUIDE_TOKEN_BUDGET)
+
+def build_messages(payload: dict, task: str, sections=MAJOR_SECTIONS) -> list[dict]:
+    """The static system prefix, the founder JSON, guide excerpts for `sections`, then the per-call task."""
+    return [*prefix_messages(), {"role": "user", "content": founder_input(payload)}, *guide_messages(sections),
+            {"role": "user", "content": task}]
+
+def founder_input(payload: dict) -> str:
+    return "Founder Input (normalized JSON):\n" + json.dumps(payload, ensure_ascii=False, indent=1)
+
+def section_template(titles: list[str]) -> str:
+    """Cut-down response template covering only the given major sections (goes in the user message)."""
+    lines = ["Write ONLY these sections, with exactly these headings and order:", ""]
+    for t in titles:
+        lines.append(t)
+        lines.extend("   " + s for s in subs_for(t))
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+# coach/ratelimit.py
+"""Token-bucket limits on requests and tokens per minute, applied around a chat-completions client."""
+import threading
+import time
+from types import SimpleNamespace
+
+
+class TokenBucket:
+    """Holds up to `capacity` units, refilled continuously at `capacity` per `period` seconds."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, n: float = 1.0):
+        """Block until `n` units are available (requests larger than the bucket wait for a full bucket)."""
+        n = min(float(n), self.capacity)
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                self._cond.wait((n - self.tokens) / self.rate)
+
+    def credit(self, n: float):
+        """Return units that were reserved but not used (e.g. estimate above actual usage)."""
+        if n <= 0:
+            return
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + n)
+            self._cond.notify_all()
+
+
+def estimate_tokens(messages: list[dict], max_tokens: int) -> int:
+    """Rough upper bound for a request: ~4 chars per prompt token plus the completion budget."""
+    return sum(len(m.get("content") or "") for m in messages) // 4 + int(max_tokens or 0)
+
+
+class RateLimitedClient:
+    """
+    Drop-in for an OpenAI client where only `chat.completions.create` is used.
+    Each call takes one request from the RPM bucket and its estimated tokens from the TPM bucket;
+    the unused part of the estimate is credited back once `usage` is known.
+    """
+
+    def __init__(self, client, rpm: float | None = None, tpm: float | None = None):
+        self._client = client
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        if self.requests:
+            self.requests.acquire(1)
+        reserved = 0
+        if self.tokens:
+            reserved = estimate_tokens(kwargs.get("messages") or [], kwargs.get("max_tokens") or 0)
+            self.tokens.acquire(reserved)
+        resp = self._client.chat.completions.create(**kwargs)
+        usage = getattr(resp, "usage", None)
+        if self.tokens and usage is not None and getattr(usage, "total_tokens", None):
+            self.tokens.credit(reserved - usage.total_tokens)
+        return resp
@@ -0,0 +1,143 @@
+# coach/report.py
+"""
+Styled Word report built from the review tree (or from stored review markdown).
+
+The styled document with the logo is built once per process (the skeleton); each report only writes
+its body as WordprocessingML fragments into a copy of it, and finished reports are memoized.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from docx import Document
+from docx.shared import Pt, Inches, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from coach.markdown import REVISION_NEW, Line, Review, parse_review
+from coach.prompts import BASE_DIR
+from coach.resources import load_if_changed, read_bytes
+
+LOGO_PATH = os.path.join(BASE_DIR, "assets", "logo.png")
+FOOTER_TEXT = "Advisory—Not Legal/Financial Advice."
+BUILT_MAX = 32  # finished reports kept in memory
+
+def logo_bytes() -> bytes | None:
+    """Logo image, read once per process and again only when the file changes."""
+    return load_if_changed(LOGO_PATH, read_bytes)
+
+# ---------- Report skeleton (styles + centered logo, built once) ----------
+BODY_MARKER = "@@REPORT_BODY@@"
+
+@lru_cache(maxsize=2)
+def report_skeleton(logo: bytes | None) -> tuple[bytes, bytes, bytes]:
+    """
+    (zip of every part except word/document.xml, document.xml before the body, document.xml after it).
+    Styles and the logo image are compressed here once instead of on every report.
+    """
+    doc = Document()
+    normal = doc.styles["Normal"].font; normal.name = "Calibri"; normal.size = Pt(11)
+    h1 = doc.styles["Heading 1"].font; h1.name = "Calibri"; h1.size = Pt(14); h1.bold = True; h1.color.rgb = RGBColor(31,78,121)
+    h2 = doc.styles["Heading 2"].font; h2.name = "Calibri"; h2.size = Pt(12); h2.bold = True; h2.color.rgb = RGBColor(0,0,0)
+    if logo:
+        try:
+            p = doc.add_paragraph(); r = p.add_run()
+            pic = r.add_picture(BytesIO(logo), width=Inches(1.5)); p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            # a stream has no file name ("image.png"); keep the one the file-path builder wrote
+            pic._inline.graphic.graphicData.pic.nvPicPr.cNvPr.name = os.path.basename(LOGO_PATH)
+        except Exception:
+            doc = None
+    if doc is None:  # unreadable logo: same skeleton without it
+        return report_skeleton(None)
+    doc.add_paragraph(BODY_MARKER)
+    src, parts = BytesIO(), BytesIO()
+    doc.save(src)
+    with ZipFile(src) as zin, ZipFile(parts, "w", ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            if info.filename == "word/document.xml":
+                document_xml = zin.read(info)
+            else:
+                zout.writestr(info, zin.read(info))
+    head, tail = document_xml.split(f"<w:p><w:r><w:t>{BODY_MARKER}</w:t></w:r></w:p>".encode())
+    return parts.getvalue(), head, tail
+
+# ---------- WordprocessingML fragments (same markup python-docx writes) ----------
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_RUN_SPLIT = re.compile(r"(\t|\r\n|\n|\r)")
+
+def run_xml(text: str, rpr: str = "") -> str:
+    """One run; tabs and line breaks become <w:tab/> and <w:br/> as with `run.text = ...`."""
+    out = []
+    for piece in _RUN_SPLIT.split(_XML_INVALID.sub("", text)):
+        if not piece: continue
+        if piece == "\t": out.append("<w:tab/>"); continue
+        if piece in ("\n", "\r", "\r\n"): out.append("<w:br/>" * len(piece)); continue
+        space = ' xml:space="preserve"' if piece.strip() != piece else ""
+        out.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    return f"<w:r>{'<w:rPr>' + rpr + '</w:rPr>' if rpr else ''}{''.join(out)}</w:r>"
+
+def paragraph_xml(text: str = "", style: str | None = None, center: bool = False) -> str:
+    ppr = (f'<w:pStyle w:val="{style}"/>' if style else "") + ('<w:jc w:val="center"/>' if center else "")
+    inner = ("<w:pPr>" + ppr + "</w:pPr>" if ppr else "") + (run_xml(text) if text else "")
+    return f"<w:p>{inner}</w:p>" if inner else "<w:p/>"
+
+def line_xml(ln: Line) -> str:
+    if ln.kind == "blank": return paragraph_xml()
+    if ln.kind == "revision":  # small italic tag under the heading: blue when new, grey when carried over
+        color = "1F4E79" if ln.md == REVISION_NEW else "808080"
+        return "<w:p>" + run_xml(ln.md.removeprefix("Revision: "), f'<w:i/><w:color w:val="{color}"/><w:sz w:val="18"/>') + "</w:p>"
+    if ln.kind == "bullet": return paragraph_xml(ln.text, "ListBullet")
+    return paragraph_xml(ln.md)
+
+def body_xml(review: Review, founder_payload: dict) -> str:
+    out = [
+        # title + description
+        paragraph_xml(f"Sinapis AI Coach – BMC Review of {founder_payload.get('business_name') or '(Unnamed Business)'}", "Title", center=True),
+        "<w:p>" + run_xml("Description: ", "<w:b/>") + run_xml(founder_payload.get("brief_description") or "—") + "</w:p>",
+    ]
+    # content
+    for sec in review.sections:
+        if sec.title is not None: out.append(paragraph_xml(sec.title, "Heading1"))
+        out.extend(line_xml(ln) for ln in sec.lines)
+        for sub in sec.subsections:
+            out.append(paragraph_xml(sub.title, "Heading2"))
+            out.extend(line_xml(ln) for ln in sub.lines)
+    # footer
+    out.append("<w:p>" + run_xml(FOOTER_TEXT, "<w:i/>") + "</w:p>")
+    return "".join(out)
+
+# ---------- DOCX builder (styled, centered logo, single footer) ----------
+_built: OrderedDict[str, bytes] = OrderedDict()
+_built_lock = threading.Lock()
+
+def build_docx(review: Review, founder_payload: dict) -> bytes:
+    """Report bytes for a review; identical content (review, name, description, logo) is built once."""
+    logo = logo_bytes()
+    key = hashlib.sha256("\0".join([
+        review.markdown(), founder_payload.get("business_name") or "", founder_payload.get("brief_description") or "",
+        hashlib.sha256(logo).hexdigest() if logo else "",
+    ]).encode("utf-8")).hexdigest()
+    with _built_lock:
+        if key in _built:
+            _built.move_to_end(key)
+            return _built[key]
+    parts, head, tail = report_skeleton(logo)
+    buf = BytesIO(parts)
+    buf.seek(0, 2)
+    with ZipFile(buf, "a", ZIP_DEFLATED) as z:
+        z.writestr("word/document.xml", head + body_xml(review, founder_payload).encode("utf-8") + tail)
+    data = buf.getvalue()
+    with _built_lock:
+        _built[key] = data
+        while len(_built) > BUILT_MAX:
+            _built.popitem(last=False)
+    return data
+
+def build_docx_from_markdown(md_text: str, founder_payload: dict) -> bytes:
+    """Report for already post-processed markdown (e.g. a cached review)."""
+    return build_docx(parse_review(md_text, []), founder_payload)
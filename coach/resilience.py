@@ -0,0 +1,290 @@
+# coach/resilience.py
+"""
+Resilient chat-completions calls: deadline-aware retries, optional hedging, model fallback and a
+circuit breaker, applied around a chat-completions client (drop-in like RateLimitedClient).
+
+- Retries: 429, 408/409, 5xx, timeouts and connection errors are retried with full-jitter exponential
+  backoff (honouring Retry-After), as long as the call's deadline leaves room for another attempt.
+- Hedging (optional): a non-streamed request still running after the observed p95 latency for its
+  model and size gets a second identical request; the first answer wins.
+- Fallback: when the remaining deadline cannot fit the primary model's expected completion time, its
+  circuit is open or it already failed once in this call (429s: `fallback_after_429s` times), the
+  call goes to the fallback model (gpt-4o → gpt-4o-mini). Callers see the answering model in `resp.model`.
+- Circuit breaker: per model, shared by every caller of the client; when half of the recent calls failed
+  (5xx, timeouts, connection errors) calls fail fast for `breaker_reset_s`, then one probe request decides.
+"""
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+import openai
+
+from coach.metrics import percentile
+
+RETRYABLE_STATUS = {408, 409, 429}
+LATENCY_SAMPLES = 200   # recent successful calls kept per (model, max_tokens)
+LATENCY_MIN_SAMPLES = 5  # below this, expected time comes from the token-rate estimate
+
+
+class CircuitOpen(Exception):
+    """Raised when every candidate model's circuit is open, without calling the API."""
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    deadline_s: float = 180.0         # budget for one create() call, retries and backoff included
+    attempt_timeout_s: float = 60.0   # per HTTP attempt (capped by what is left of the deadline)
+    max_attempts: int = 4
+    backoff_base_s: float = 1.0
+    backoff_max_s: float = 20.0
+    hedge: bool = False
+    hedge_min_s: float = 5.0          # never hedge before this, whatever the p95
+    fallback: dict = field(default_factory=lambda: {"gpt-4o": "gpt-4o-mini"})
+    fallback_after_429s: int = 2      # one throttle is backed off on the same model, not a reason to switch
+    # Completion speed assumed until enough calls were observed (tokens/s, conservative).
+    tokens_per_s: dict = field(default_factory=lambda: {"gpt-4o": 50.0, "gpt-4o-mini": 80.0})
+    breaker_failure_ratio: float = 0.5  # of the last breaker_window calls (429s not counted)
+    breaker_window: int = 20
+    breaker_min_calls: int = 10
+    breaker_reset_s: float = 30.0
+
+
+def is_retryable(e: Exception) -> bool:
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return isinstance(e, (openai.APIConnectionError, TimeoutError, ConnectionError))
+
+
+def retry_after_s(e: Exception) -> float | None:
+    """Server-suggested wait from Retry-After / retry-after-ms headers, if any."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form; fall back to our own backoff
+    return None
+
+
+class CircuitBreaker:
+    """
+    closed → open once at least `min_calls` of the last `window` outcomes are in and `failure_ratio`
+    of them failed → half-open after `reset_s`: one probe request closes it again or re-opens it.
+    """
+
+    def __init__(self, failure_ratio: float = 0.5, window: int = 20, min_calls: int = 10, reset_s: float = 30.0,
+                 clock=time.monotonic):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.reset_s = reset_s
+        self.clock = clock
+        self.outcomes: deque = deque(maxlen=window)  # True = failure
+        self.opened_at: float | None = None
+        self.opens = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_s else "open"
+
+    def retry_in_s(self) -> float:
+        return 0.0 if self.opened_at is None else max(0.0, self.opened_at + self.reset_s - self.clock())
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                self.outcomes.clear()  # closed again after a good probe: start counting afresh
+            self.outcomes.append(False)
+            self.opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.outcomes.append(True)
+            if self._probing:
+                self.opened_at = self.clock(); self.opens += 1
+            elif self.opened_at is None and len(self.outcomes) >= self.min_calls \
+                    and sum(self.outcomes) >= self.failure_ratio * len(self.outcomes):
+                self.opened_at = self.clock(); self.opens += 1
+            self._probing = False
+
+    def release(self):
+        """Give back a probe slot whose call failed for a reason that says nothing about the service."""
+        with self._lock:
+            self._probing = False
+
+
+class LatencyStats:
+    """Recent successful call durations per (model, max_tokens)."""
+
+    def __init__(self):
+        self._samples: dict[tuple, deque] = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self._lock = threading.Lock()
+
+    def record(self, model: str, max_tokens, seconds: float):
+        with self._lock:
+            self._samples[(model, max_tokens)].append(seconds)
+
+    def p95(self, model: str, max_tokens) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get((model, max_tokens), ()))
+        return percentile(samples, 0.95) if len(samples) >= LATENCY_MIN_SAMPLES else None
+
+
+class ResilientClient:
+    """
+    Drop-in for an OpenAI client where only `chat.completions.create` is used. Streamed calls are
+    retried only while opening the stream (a half-read stream is never replayed) and are not hedged.
+    """
+
+    def __init__(self, client, policy: CallPolicy | None = None, sleep=time.sleep, clock=time.monotonic):
+        # our retries replace the SDK's own (which ignore the deadline)
+        self._client = client.with_options(max_retries=0) if hasattr(client, "with_options") else client
+        self.policy = policy or CallPolicy()
+        self.sleep = sleep
+        self.clock = clock
+        self.latency = LatencyStats()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._counts: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge") if self.policy.hedge else None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(
+                    self.policy.breaker_failure_ratio, self.policy.breaker_window, self.policy.breaker_min_calls,
+                    self.policy.breaker_reset_s, self.clock,
+                )
+            return self._breakers[model]
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counts)
+            out["breakers"] = {m: b.state for m, b in self._breakers.items()}
+        return out
+
+    def expected_s(self, model: str, max_tokens) -> float:
+        """p95 of recent calls of this size, or max_tokens at the assumed completion speed."""
+        p95 = self.latency.p95(model, max_tokens)
+        if p95 is not None:
+            return p95
+        return (max_tokens or 1000) / self.policy.tokens_per_s.get(model, 50.0)
+
+    def _choose_model(self, model: str, remaining: float, max_tokens, failed: set) -> str | None:
+        """
+        The requested model, or its fallback when the deadline is too short, the circuit is open, or
+        it already failed during this call.
+        """
+        while model:
+            fallback = self.policy.fallback.get(model)
+            if fallback and model in failed:
+                self._count("fallback_failed")
+            elif fallback and remaining < self.expected_s(model, max_tokens):
+                self._count("fallback_deadline")
+            elif self.breaker(model).allow():
+                return model
+            elif fallback:
+                self._count("fallback_breaker")
+            else:
+                self._count("breaker_rejected")
+                return None
+            model = fallback
+        return None
+
+    def _call(self, request: dict):
+        return self._client.chat.completions.create(**request)
+
+    def _hedged(self, request: dict, after_s: float):
+        first = self._hedge_pool.submit(self._call, request)
+        done, _ = wait([first], timeout=after_s)
+        if done:
+            return first.result()
+        self._count("hedges")
+        second = self._hedge_pool.submit(self._call, request)
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is second:
+                        self._count("hedge_wins")
+                    return fut.result()
+                error = fut.exception()
+        raise error
+
+    def create(self, **request):
+        p = self.policy
+        deadline = self.clock() + p.deadline_s
+        requested, max_tokens = request.get("model"), request.get("max_tokens")
+        streamed = bool(request.get("stream"))
+        self._count("calls")
+        attempt, failed, throttled = 0, set(), defaultdict(int)
+        while True:
+            remaining = deadline - self.clock()
+            model = self._choose_model(requested, remaining, max_tokens, failed)
+            if model is None:
+                b = self.breaker(requested)
+                raise CircuitOpen(f"{requested} is failing; calls paused, retry in {b.retry_in_s():.0f}s")
+            breaker = self.breaker(model)
+            req = dict(request, model=model, timeout=max(1.0, min(p.attempt_timeout_s, remaining)))
+            t0 = self.clock()
+            try:
+                hedge_after = None if streamed or not p.hedge else self.latency.p95(model, max_tokens)
+                if hedge_after is not None:
+                    resp = self._hedged(req, max(p.hedge_min_s, hedge_after))
+                else:
+                    resp = self._call(req)
+            except Exception as e:
+                if not is_retryable(e):
+                    breaker.release()
+                    raise
+                attempt += 1
+                if getattr(e, "status_code", None) == 429:
+                    breaker.release()  # throttled, not broken: back off but keep the circuit closed
+                    throttled[model] += 1
+                    if throttled[model] >= p.fallback_after_429s:
+                        failed.add(model)
+                else:
+                    breaker.failure()
+                    failed.add(model)
+                delay = retry_after_s(e)
+                if delay is None:
+                    delay = random.uniform(0, min(p.backoff_max_s, p.backoff_base_s * 2 ** attempt))
+                if attempt >= p.max_attempts or self.clock() + delay >= deadline - 1.0:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self.sleep(delay)
+                continue
+            breaker.success()
+            if not streamed:
+                self.latency.record(model, max_tokens, self.clock() - t0)
+            if model != requested:
+                self._count("fallbacks")
+            return resp
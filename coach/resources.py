@@ -0,0 +1,41 @@
+# coach/resources.py
+"""Small on-disk resources (guides, logo) loaded once per process and re-read only when the file changes."""
+import os
+import threading
+
+_lock = threading.Lock()
+_entries: dict[tuple, tuple] = {}  # (path, loader) -> ((mtime_ns, size), value)
+
+
+def load_if_changed(path: str, loader, default=None):
+    """
+    `loader(path)` on first use, then again only when the file's mtime or size changes.
+    Missing or unreadable files give `default` (and are retried on the next call).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return default
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (path, loader)
+    with _lock:
+        hit = _entries.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+    try:
+        value = loader(path)
+    except Exception:
+        return default
+    with _lock:
+        _entries[key] = (stamp, value)
+    return value
+
+
+def read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,238 @@
+# coach/review.py
+"""Review calls against the chat-completions API: single completion, streamed, or per-block fan-out."""
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from coach.cache import review_cache_key
+from coach.markdown import Review, parse_review
+from coach.prompts import build_messages, excerpts_fingerprint, prefix_messages, section_template
+from coach.sections import BLOCK_SECTIONS, MAJOR_SECTIONS, SYNTHESIS_SECTIONS, list_empty_blocks
+from coach.validate import section_deficit
+
+SNAPSHOT_RE = re.compile(r"-\d{4}-\d{2}-\d{2}$")  # 'gpt-4o-2024-08-06' answers a request for gpt-4o
+
+
+@dataclass(frozen=True)
+class ReviewConfig:
+    model: str = "gpt-4o-mini"
+    max_tokens: int = 5000
+    fanout: bool = False
+    fanout_workers: int = 6
+    block_max_tokens: int = 1400
+    synthesis_max_tokens: int = 2000
+    repair: bool = True  # re-request sections that fail validation (see repair_sections)
+
+    @classmethod
+    def for_model(cls, model: str, **kw) -> "ReviewConfig":
+        """Token limits follow the model (gpt-4o gets the larger budgets)."""
+        big = model == "gpt-4o"
+        kw.setdefault("max_tokens", 7000 if big else 5000)
+        kw.setdefault("block_max_tokens", 1800 if big else 1400)
+        return cls(model=model, **kw)
+
+    @property
+    def mode(self) -> str:
+        return f"fanout:{self.block_max_tokens}/{self.synthesis_max_tokens}" if self.fanout else "single"
+
+
+class Usage:
+    """
+    Token counts from `resp.usage`, summed over every call that makes up one review (thread-safe).
+    Also split by the model that answered, since a call may have fallen back to another model;
+    `fallback_calls` counts calls answered by a model other than the requested one.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.fallback_calls = 0
+        self.models: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def degraded(self) -> bool:
+        """Part of the review was written by a fallback model (don't store it as the requested model's)."""
+        return self.fallback_calls > 0
+
+    def add(self, usage, model: str | None = None, requested: str | None = None):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        counts = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += counts["prompt_tokens"]
+            self.cached_tokens += counts["cached_tokens"]
+            self.completion_tokens += counts["completion_tokens"]
+            if model and requested and SNAPSHOT_RE.sub("", model) != requested:
+                self.fallback_calls += 1
+            if model:
+                per_model = self.models.setdefault(model, dict.fromkeys(counts, 0))
+                for k, n in counts.items():
+                    per_model[k] += n
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "fallback_calls": self.fallback_calls,
+                "models": {m: dict(c) for m, c in self.models.items()},
+            }
+
+
+# ---------- Review calls (single completion or per-block fan-out) ----------
+def complete(client, messages: list[dict], max_tokens: int, config: ReviewConfig, usage: Usage | None = None) -> str:
+    resp = client.chat.completions.create(
+        model=config.model,
+        temperature=0.0,
+        max_tokens=max_tokens,
+        messages=messages,
+    )
+    if usage is not None:
+        usage.add(getattr(resp, "usage", None), getattr(resp, "model", None), config.model)
+    return resp.choices[0].message.content or ""
+
+def cache_key_for(payload: dict, config: ReviewConfig) -> str:
+    # the guide excerpts any call of the review can get: the one-call scope, each section alone (fan-out,
+    # repairs) and the synthesis. They change with the guides, GUIDE_TOKEN_BUDGET and the token counter.
+    scopes = [requested_sections(list_empty_blocks(payload)), SYNTHESIS_SECTIONS, *([t] for t in MAJOR_SECTIONS)]
+    system_messages = [m["content"] for m in prefix_messages()] + [excerpts_fingerprint(scopes)]
+    return review_cache_key(payload, system_messages, config.model, config.max_tokens, config.mode)
+
+def requested_sections(empty_blocks: list[str]) -> list[str]:
+    """Sections the model writes: the filled blocks plus 13) and 14). Empty blocks are filled in locally."""
+    return [t for t in MAJOR_SECTIONS if t not in empty_blocks]
+
+def single_review_message(empty_blocks: list[str]) -> str:
+    if not empty_blocks:
+        return "EMPTY_BLOCKS: []\n\nUse the response template exactly."
+    return (
+        "EMPTY_BLOCKS (already marked Missing/Needs input; do not write them): "
+        + json.dumps(empty_blocks, ensure_ascii=False)
+        + "\n\n" + section_template(requested_sections(empty_blocks))
+    )
+
+def single_review_messages(payload: dict, empty_blocks: list[str]) -> list[dict]:
+    return build_messages(payload, single_review_message(empty_blocks), requested_sections(empty_blocks))
+
+def run_single_review(client, payload: dict, empty_blocks: list[str], config: ReviewConfig, usage: Usage | None = None) -> str:
+    """One completion that writes every section except the empty blocks."""
+    return complete(client, single_review_messages(payload, empty_blocks), config.max_tokens, config, usage)
+
+def stream_single_review(client, payload: dict, empty_blocks: list[str], config: ReviewConfig, usage: Usage | None = None):
+    """Same request as run_single_review with stream=True; yields text deltas as they arrive."""
+    stream = client.chat.completions.create(
+        model=config.model,
+        temperature=0.0,
+        max_tokens=config.max_tokens,
+        messages=single_review_messages(payload, empty_blocks),
+        stream=True,
+        stream_options={"include_usage": True},  # final chunk carries usage, with no choices
+    )
+    for chunk in stream:
+        if usage is not None and getattr(chunk, "usage", None):
+            usage.add(chunk.usage, getattr(chunk, "model", None), config.model)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def review_block(client, payload: dict, title: str, config: ReviewConfig, usage: Usage | None = None) -> str:
+    """Review a single canvas block; the rest of the payload is context only."""
+    task = (
+        f"Review ONLY the block '{title}'. Use the other blocks as context but do not assess them."
+        + "\n\n" + section_template([title])
+    )
+    md = complete(client, build_messages(payload, task, [title]), config.block_max_tokens, config, usage).strip()
+    # make sure the merged review still has this block's '## ' heading
+    first = md.splitlines()[0].lstrip("#").strip() if md else ""
+    return md if first == title else f"## {title}\n{md}"
+
+def synthesize_review(client, payload: dict, empty_blocks: list[str], blocks_md: str, config: ReviewConfig, usage: Usage | None = None) -> str:
+    """Sections 13) and 14), written over the merged per-block reviews."""
+    task = (
+        "EMPTY_BLOCKS: " + json.dumps(empty_blocks, ensure_ascii=False)
+        + "\n\nPer-block reviews (already written; do not repeat them):\n" + blocks_md
+        + "\n\n" + section_template(SYNTHESIS_SECTIONS)
+    )
+    return complete(client, build_messages(payload, task, SYNTHESIS_SECTIONS), config.synthesis_max_tokens, config, usage)
+
+def run_fanout_review(client, payload: dict, empty_blocks: list[str], config: ReviewConfig, usage: Usage | None = None,
+                      reuse: dict[str, str] | None = None) -> str:
+    """
+    Review each filled block in its own concurrent request, then synthesize 13) + 14).
+    Empty blocks are not sent; they keep a bare heading that the review parser fills with Missing.
+    Blocks in `reuse` (title → section markdown from an earlier draft) are not sent either.
+    Wall time is roughly the slowest block plus the synthesis call.
+    """
+    reuse = reuse or {}
+    titles = [t for t in BLOCK_SECTIONS if t not in empty_blocks and t not in reuse]
+    parts = {t: "## " + t for t in BLOCK_SECTIONS if t in empty_blocks}
+    parts.update({t: md for t, md in reuse.items() if t not in empty_blocks})
+    if titles:
+        with ThreadPoolExecutor(max_workers=max(1, min(config.fanout_workers, len(titles)))) as pool:
+            futures = {t: pool.submit(review_block, client, payload, t, config, usage) for t in titles}
+            for t, fut in futures.items():
+                parts[t] = fut.result()
+    blocks_md = "\n\n".join(parts[t] for t in BLOCK_SECTIONS)
+    return blocks_md + "\n\n" + synthesize_review(client, payload, empty_blocks, blocks_md, config, usage)
+
+# ---------- Repair of sections that fail validation ----------
+def repair_message(title: str, current_md: str, issues: list[str]) -> str:
+    return (
+        f"Your review of the section '{title}' does not meet the response template: " + "; ".join(issues) + "."
+        + "\nRewrite the whole section: keep its valid points, add what is missing, and meet every minimum bullet count."
+        + ("\n\nCurrent section:\n" + current_md if current_md else "")
+        + "\n\n" + section_template([title])
+    )
+
+def repair_section(client, payload: dict, review: Review, title: str, issues: list[str], config: ReviewConfig,
+                   usage: Usage | None = None):
+    current = review.section(title)
+    max_tokens = config.synthesis_max_tokens if title in SYNTHESIS_SECTIONS else config.block_max_tokens
+    md = complete(client, build_messages(payload, repair_message(title, current.markdown(revision=False) if current else "", issues), [title]),
+                  max_tokens, config, usage)
+    return parse_review(md, []).section(title)
+
+def repair_sections(client, payload: dict, review: Review, problems: dict[str, list[str]], config: ReviewConfig,
+                    usage: Usage | None = None) -> list[str]:
+    """
+    One small concurrent request per failing section (`problems` from validate_review); a rewrite
+    replaces a missing section outright, and an existing one only if it is closer to passing (smaller
+    section_deficit). Returns the replaced titles.
+    A failed repair call keeps the original section, since the review is usable as it is.
+    """
+    if not problems:
+        return []
+    replaced = []
+    with ThreadPoolExecutor(max_workers=max(1, min(config.fanout_workers, len(problems)))) as pool:
+        futures = {t: pool.submit(repair_section, client, payload, review, t, issues, config, usage) for t, issues in problems.items()}
+        for title, fut in futures.items():
+            try:
+                sec = fut.result()
+            except Exception:
+                continue
+            old = review.section(title)
+            if sec is None or (old is not None and section_deficit(sec) >= section_deficit(old)):
+                continue
+            if old is not None and old.revision:
+                sec.mark_revision(new=True)
+            review.replace_section(sec)
+            replaced.append(title)
+    return replaced
+
+def run_review(client, payload: dict, empty_blocks: list[str], config: ReviewConfig, usage: Usage | None = None) -> str:
+    """Raw (not yet post-processed) review markdown in the configured mode."""
+    if config.fanout:
+        return run_fanout_review(client, payload, empty_blocks, config, usage)
+    return run_single_review(client, payload, empty_blocks, config, usage)
@@ -0,0 +1,119 @@
+# coach/revisions.py
+"""
+Earlier drafts of the same business, for incremental re-review.
+
+Each finished review is recorded with a hash of every canvas field and the markdown of each block's
+section. When a new draft of the same business arrives (matched on `business_name` by default,
+case/punctuation-insensitive), blocks whose field hash is unchanged keep their stored critique; only
+changed blocks and the synthesis sections (13, 14) go back to the model. Drafts are only matched
+against reviews written with the same prompts, guides and model (`version`).
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from coach.cache import normalize_payload
+from coach.markdown import Review
+from coach.parser import FIELD_ALIASES
+from coach.sections import BLOCK_KEYS, BLOCK_SECTIONS
+
+KEEP_PER_BUSINESS = 10  # drafts kept per business (and version)
+
+
+def business_key(payload: dict, fields: tuple[str, ...] = ("business_name",)) -> str:
+    """'Acme Foods Ltd.' and 'ACME foods ltd' match; empty when none of the key fields is filled."""
+    parts = [re.sub(r"\W+", " ", str(payload.get(f) or "")).strip().casefold() for f in fields]
+    return "|".join(parts) if any(parts) else ""
+
+
+def field_hashes(payload: dict) -> dict[str, str]:
+    norm = normalize_payload({k: payload.get(k) or "" for k in FIELD_ALIASES})
+    return {k: hashlib.sha256(v.encode("utf-8")).hexdigest()[:16] for k, v in norm.items()}
+
+
+@dataclass
+class Revision:
+    id: int
+    business: str
+    created: float
+    hashes: dict[str, str]
+    sections: dict[str, str]  # block title → section markdown (filled blocks only, no revision marker)
+
+    def reusable(self, payload: dict) -> dict[str, str]:
+        """Stored sections of the blocks that are filled and unchanged in `payload`."""
+        now = field_hashes(payload)
+        return {
+            t: self.sections[t] for t in BLOCK_SECTIONS
+            if t in self.sections and (payload.get(BLOCK_KEYS[t]) or "").strip()
+            and self.hashes.get(BLOCK_KEYS[t]) == now[BLOCK_KEYS[t]]
+        }
+
+
+class RevisionStore:
+    def __init__(self, path: str, key_fields: tuple[str, ...] = ("business_name",)):
+        self.path = path
+        self.key_fields = tuple(key_fields)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS revisions ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, business TEXT NOT NULL, version TEXT NOT NULL,"
+                " created REAL NOT NULL, hashes TEXT NOT NULL, sections TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS revisions_business ON revisions(business, version, id)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def latest(self, payload: dict, version: str) -> Revision | None:
+        """The most recent earlier draft of this business reviewed under `version`, if any."""
+        business = business_key(payload, self.key_fields)
+        if not business:
+            return None
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, business, created, hashes, sections FROM revisions"
+                " WHERE business = ? AND version = ? ORDER BY id DESC LIMIT 1",
+                (business, version),
+            ).fetchone()
+        if row is None:
+            return None
+        return Revision(row[0], row[1], row[2], json.loads(row[3]), json.loads(row[4]))
+
+    def put(self, payload: dict, version: str, review: Review):
+        """Record a finished review as the latest draft of its business."""
+        business = business_key(payload, self.key_fields)
+        if not business:
+            return
+        sections = {
+            sec.title: sec.markdown(revision=False) for sec in review.sections
+            if sec.title in BLOCK_KEYS and not sec.missing
+        }
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO revisions(business, version, created, hashes, sections) VALUES (?, ?, ?, ?, ?)",
+                (business, version, time.time(), json.dumps(field_hashes(payload)), json.dumps(sections, ensure_ascii=False)),
+            )
+            db.execute(
+                "DELETE FROM revisions WHERE business = ? AND version = ? AND id NOT IN"
+                " (SELECT id FROM revisions WHERE business = ? AND version = ? ORDER BY id DESC LIMIT ?)",
+                (business, version, business, version, KEEP_PER_BUSINESS),
+            )
+
+
+def mark_revisions(review: Review, carried: set[str]):
+    """Tag every reviewed section as new in this draft, or carried over from the previous one."""
+    for sec in review.sections:
+        if sec.title in carried:
+            sec.mark_revision(new=False)
+        elif sec.title is not None and not sec.missing:
+            sec.mark_revision(new=True)
@@ -0,0 +1,31 @@
+# coach/sections.py
+"""Canvas blocks and the section/subheading layout of the Sinapis response template."""
+
+MAJOR_SECTIONS = [
+    "1) Problem","2) Value Proposition","3) Unfair Advantage","4) Customer Segments",
+    "5) Channels","6) Customer Relationships","7) Key Activities","8) Key Resources",
+    "9) Key Partners","10) Revenue Streams","11) Cost Structure","12) Kingdom Impact",
+    "13) Cross-Block Observations","14) Final Assessment"
+]
+SUBS_STANDARD = ["Strengths","Weaknesses","Probing Questions","Suggested Explorations"]
+SUBS_13 = ["Inconsistencies","Opportunities to Strengthen"]
+SUBS_14 = ["Quick Wins","Deeper Strategic Questions","Overall Cohesiveness"]
+ADVISORY_TEXTS = {"Advisory—Not Legal/Financial Advice.","Footer: Advisory—Not Legal/Financial Advice."}
+
+BLOCK_KEYS = {
+    "1) Problem":"problem","2) Value Proposition":"value_proposition","3) Unfair Advantage":"unfair_advantage",
+    "4) Customer Segments":"customer_segments","5) Channels":"channels","6) Customer Relationships":"customer_relationships",
+    "7) Key Activities":"key_activities","8) Key Resources":"key_resources","9) Key Partners":"key_partners",
+    "10) Revenue Streams":"revenue_streams","11) Cost Structure":"cost_structure","12) Kingdom Impact":"kingdom_impact",
+}
+BLOCK_SECTIONS = MAJOR_SECTIONS[:12]
+SYNTHESIS_SECTIONS = MAJOR_SECTIONS[12:]
+
+def list_empty_blocks(payload: dict):
+    return [title for title, k in BLOCK_KEYS.items() if not (payload.get(k) or "").strip()]
+
+def subs_for(t): return SUBS_13 if t=="13) Cross-Block Observations" else (SUBS_14 if t=="14) Final Assessment" else SUBS_STANDARD)
+
+def filled_block_count(payload: dict) -> int:
+    """The 'Parsed X/12' figure: canvas blocks with any input."""
+    return sum(1 for k in BLOCK_KEYS.values() if (payload.get(k) or "").strip())
@@ -0,0 +1,175 @@
+# coach/similar.py
+"""
+Near-duplicate submissions: a MinHash/LSH index over the 12 canvas blocks of earlier submissions.
+
+Each submission is reduced to hashed word 3-gram shingles per block (case and punctuation ignored,
+tagged with the block so text moved between blocks does not match) and a 128-value MinHash signature. The
+signatures are split into 16 bands of 8 rows; submissions sharing any band are candidates, and their
+similarity is the fraction of equal signature values (an estimate of Jaccard similarity). A pair at
+0.8 shares a band about 95% of the time, one at 0.9 more than 99.9%. Replacing 2% of the words leaves
+about 0.89 similarity (single replacements change three 3-grams each), so the default threshold of
+0.8 finds ~98% of such edits and ~100% of cosmetic ones; 10% edits fall below it. A lookup is 16 dict
+probes plus a compare per candidate, independent of the index size.
+
+Entries point at the review cache key of the submission's review; the index itself stores only
+signatures (SQLite, loaded into memory at startup).
+"""
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+
+from coach.sections import BLOCK_KEYS
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+_MIX = np.uint32(0x9E3779B1)
+_WORD = re.compile(r"\w+")
+_TABLE_END = 0x2070  # through General Punctuation: Latin text, dashes and smart quotes tokenize without the regex
+_NON_WORD = str.maketrans({c: " " for c in map(chr, range(_TABLE_END)) if not _WORD.match(c)})
+_PAST_TABLE = re.compile(f"[^\\x00-\\u{_TABLE_END - 1:04x}]")
+_BLOCK_TAGS = {key: zlib.crc32(key.encode("ascii")) for key in BLOCK_KEYS.values()}
+_rng = np.random.RandomState(20240601)  # fixed: stored signatures must stay comparable across restarts
+_A = (_rng.randint(0, 2**31, NUM_PERM, dtype=np.uint64) * 2 + 1).astype(np.uint32)  # odd multipliers
+_B = _rng.randint(0, 2**32, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+
+
+def _words(text: str) -> list[str]:
+    """Casefolded `\\w+` words; a translate table and split() when every character is in the table."""
+    text = text.casefold()
+    if text.isascii() or not _PAST_TABLE.search(text):
+        return text.translate(_NON_WORD).split()
+    return _WORD.findall(text)
+
+
+def shingle_hashes(payload: dict) -> np.ndarray:
+    """
+    32-bit hashes of the word 3-grams of each block (a block with fewer words is one shingle). The
+    words of all blocks are hashed in one pass and the 3-grams combined with one set of array ops.
+    """
+    tokens, tags, counts, short = [], [], [], []
+    for key in BLOCK_KEYS.values():
+        ws = _words(str(payload.get(key) or ""))
+        if len(ws) >= SHINGLE_WORDS:
+            tags.append(_BLOCK_TAGS[key])
+            counts.append(len(ws) - SHINGLE_WORDS + 1)
+            tokens += ws
+        elif ws:
+            short.append((key, ws))
+    w = np.fromiter(map(zlib.crc32, map(str.encode, tokens)), dtype=np.uint32, count=len(tokens))
+    counts = np.array(counts, dtype=np.intp)
+    # start of each shingle: skip the last SHINGLE_WORDS - 1 words of every earlier block
+    idx = np.arange(counts.sum()) + np.repeat(np.arange(len(counts)) * (SHINGLE_WORDS - 1), counts)
+    h = np.repeat(np.array(tags, dtype=np.uint32), counts)
+    for j in range(SHINGLE_WORDS):
+        h = h * _MIX ^ w[idx + j]
+    for key, ws in short:  # one shingle of all its words
+        g = _BLOCK_TAGS[key]
+        for word in ws:
+            g = (g * int(_MIX) & 0xFFFFFFFF) ^ zlib.crc32(word.encode())
+        h = np.append(h, np.uint32(g))
+    return h
+
+
+def signature(payload: dict) -> np.ndarray | None:
+    """MinHash signature of the canvas blocks (None when every block is empty)."""
+    h = shingle_hashes(payload)
+    if not len(h):
+        return None
+    v = h[:, None] * _A  # one hash function a*h + b (mod 2**32) per column
+    v += _B
+    return v.min(axis=0)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+@dataclass
+class Match:
+    key: str          # review cache key of the earlier submission's review
+    similarity: float
+    created: float
+    business: str
+
+
+class SimilarityIndex:
+    def __init__(self, path: str, threshold: float = 0.8):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._rows: list[tuple | None] = []  # (key, created, business, signature); None once discarded
+        self._pos: dict[str, int] = {}
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(BANDS)]
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS submissions ("
+                " key TEXT PRIMARY KEY, created REAL NOT NULL, business TEXT NOT NULL, signature BLOB NOT NULL)"
+            )
+            for key, created, business, sig in db.execute("SELECT key, created, business, signature FROM submissions ORDER BY created"):
+                self._insert(key, created, business, np.frombuffer(sig, dtype=np.uint32))
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @property
+    def size(self) -> int:
+        return len(self._pos)
+
+    def _insert(self, key: str, created: float, business: str, sig: np.ndarray):
+        i = len(self._rows)
+        self._rows.append((key, created, business, sig))
+        self._pos[key] = i
+        for band, buckets in enumerate(self._buckets):
+            buckets.setdefault(sig[band * ROWS:(band + 1) * ROWS].tobytes(), []).append(i)
+
+    def add(self, payload: dict, key: str):
+        """Index a reviewed submission under the cache key of its review."""
+        sig = signature(payload)
+        if sig is None:
+            return
+        with self._lock:
+            if key in self._pos:
+                return
+            created, business = time.time(), str(payload.get("business_name") or "")
+            self._insert(key, created, business, sig)
+        with self._connect() as db:
+            db.execute("INSERT OR IGNORE INTO submissions(key, created, business, signature) VALUES (?, ?, ?, ?)",
+                       (key, created, business, sig.tobytes()))
+
+    def discard(self, key: str):
+        """Forget an entry (e.g. its review was evicted from the cache)."""
+        with self._lock:
+            i = self._pos.pop(key, None)
+            if i is not None:
+                self._rows[i] = None
+        with self._connect() as db:
+            db.execute("DELETE FROM submissions WHERE key = ?", (key,))
+
+    def find(self, payload: dict, threshold: float | None = None) -> list[Match]:
+        """Earlier submissions at least `threshold` similar to `payload`, most similar (then newest) first."""
+        sig = signature(payload)
+        if sig is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates = set()
+            for band, buckets in enumerate(self._buckets):
+                candidates.update(buckets.get(sig[band * ROWS:(band + 1) * ROWS].tobytes(), ()))
+            rows = [self._rows[i] for i in candidates if self._rows[i] is not None]
+        matches = [Match(key, s, created, business) for key, created, business, other in rows
+                   if (s := similarity(sig, other)) >= threshold]
+        return sorted(matches, key=lambda m: (-m.similarity, -m.created))
@@ -0,0 +1,305 @@
+# coach/stub_openai.py
+"""
+Local stand-in for the OpenAI chat-completions endpoint, for offline runs of the app, the batch tool,
+benchmarks and load tests (select it with LLM_BACKEND="mock", see coach.llm).
+
+It answers POST /v1/chat/completions, streamed (SSE, with the usage chunk when asked for) or not, with
+a canned review in the Sinapis response format covering whichever major sections the request asks
+for, with the depth minimums met. StubClient gives the same answers in-process, without HTTP.
+
+Timing: a time to first token drawn from a fixed, uniform, lognormal or exponential distribution,
+then the completion at a given token rate (streamed responses arrive at that pace).
+
+Faults can be injected to exercise the retry/fallback layer (coach.resilience): random 5xx and 429
+responses, slow responses, a number of failures before the first success, and models that are down.
+
+    python -m coach.stub_openai --port 8765
+    python -m coach.stub_openai --port 8765 --first-token 0.8 --dist lognormal --spread 0.5 --tokens-per-s 80
+    python -m coach.stub_openai --port 8765 --error-rate 0.2 --rate-limit-rate 0.1 --slow-rate 0.05 --slow-latency 30
+    python -m coach.batch submissions/ --out reports/ --base-url http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from coach.prompts import DEPTH_MIN_COUNTS
+from coach.sections import MAJOR_SECTIONS, subs_for
+
+RATINGS = ("Weak", "Average", "Good")
+FOOTER = "Advisory—Not Legal/Financial Advice."
+STREAM_PIECE_CHARS = 16  # characters per streamed delta (about 4 tokens)
+
+
+def requested_sections(messages: list[dict]) -> list[str]:
+    """Major sections the user message scopes the call to (all 14 for a full review)."""
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    lines = {ln.strip() for ln in user.splitlines()}
+    return [t for t in MAJOR_SECTIONS if t in lines] or list(MAJOR_SECTIONS)
+
+
+def canned_review(sections: list[str]) -> str:
+    out = []
+    for title in sections:
+        out.append(f"## {title}")
+        out.append(f"Rating: {RATINGS[MAJOR_SECTIONS.index(title) % 3]} — stub review generated offline.")
+        for sub in subs_for(title):
+            out.append(f"### {sub}")
+            for i in range(DEPTH_MIN_COUNTS.get(sub, 3)):
+                out.append(f"- {sub} point {i + 1} for {title}.")
+        out.append("")
+    if sections and sections[-1] == MAJOR_SECTIONS[-1]:
+        out.append(FOOTER)
+    return "\n".join(out).strip()
+
+
+def usage_body(messages: list[dict], content: str) -> dict:
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def completion_body(request: dict, review=canned_review) -> dict:
+    """`review(sections)` writes the answer text (canned_review unless a benchmark supplies its own)."""
+    messages = request.get("messages") or []
+    content = review(requested_sections(messages))
+    return {
+        "id": "chatcmpl-stub-" + uuid.uuid4().hex[:12],
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model") or "stub",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": usage_body(messages, content),
+    }
+
+
+def stream_bodies(request: dict, review=canned_review, tokens_per_s: float = 0.0):
+    """
+    (delay before it, chunk) pairs of a streamed answer: the content in small deltas paced at
+    `tokens_per_s`, a finish chunk, then the usage chunk if stream_options.include_usage is set.
+    """
+    messages = request.get("messages") or []
+    content = review(requested_sections(messages))
+    base = {"id": "chatcmpl-stub-" + uuid.uuid4().hex[:12], "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": request.get("model") or "stub"}
+    delay = STREAM_PIECE_CHARS / 4 / tokens_per_s if tokens_per_s else 0.0
+    yield 0.0, dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+    for i in range(0, len(content), STREAM_PIECE_CHARS):
+        yield delay, dict(base, choices=[{"index": 0, "delta": {"content": content[i:i + STREAM_PIECE_CHARS]}, "finish_reason": None}])
+    yield 0.0, dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    if (request.get("stream_options") or {}).get("include_usage"):
+        yield 0.0, dict(base, choices=[], usage=usage_body(messages, content))
+
+
+def paced(bodies):
+    """Chunks of stream_bodies on their schedule (sleeping only when ahead of it, so delays don't add up)."""
+    due = time.monotonic()
+    for delay, chunk in bodies:
+        due += delay
+        ahead = due - time.monotonic()
+        if ahead > 0.001:
+            time.sleep(ahead)
+        yield chunk
+
+
+@dataclass
+class Timing:
+    """How long answers take: time to first token drawn from `dist`, then the completion at `tokens_per_s`."""
+    first_token_s: float = 0.0  # median time to first token
+    dist: str = "fixed"         # fixed | uniform (± spread s) | lognormal (sigma = spread) | exponential
+    spread: float = 0.0
+    tokens_per_s: float = 0.0   # completion speed; 0 = the whole answer at once
+    seed: int | None = None
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def first_token(self) -> float:
+        m = self.first_token_s
+        if not m or self.dist == "fixed":
+            return m
+        with self._lock:
+            if self.dist == "uniform":
+                return max(0.0, self._rng.uniform(m - self.spread, m + self.spread))
+            if self.dist == "lognormal":
+                return m * math.exp(self._rng.gauss(0.0, self.spread))
+            if self.dist == "exponential":
+                return self._rng.expovariate(math.log(2) / m)
+        raise ValueError(f"unknown latency distribution {self.dist!r}")
+
+    def generation_s(self, completion_tokens: int) -> float:
+        return completion_tokens / self.tokens_per_s if self.tokens_per_s else 0.0
+
+
+class StubClient:
+    """In-process stand-in for `OpenAI()`: `client.chat.completions.create(...)` answers like the stub server."""
+
+    def __init__(self, review=canned_review, latency_s: float = 0.0, timing: Timing | None = None):
+        self.review = review
+        self.timing = timing or Timing(first_token_s=latency_s)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        if request.get("stream"):
+            return self._stream(request)
+        body = completion_body(request, self.review)
+        wait = self.timing.first_token() + self.timing.generation_s(body["usage"]["completion_tokens"])
+        if wait:
+            time.sleep(wait)
+        return ChatCompletion.model_validate(body)
+
+    def _stream(self, request: dict):
+        first = self.timing.first_token()
+        if first:
+            time.sleep(first)
+        for chunk in paced(stream_bodies(request, self.review, self.timing.tokens_per_s)):
+            yield ChatCompletionChunk.model_validate(chunk)
+
+
+@dataclass
+class Faults:
+    """What the stub server does wrong, decided per request (thread-safe, reproducible with `seed`)."""
+    error_rate: float = 0.0       # 500/502/503 responses
+    rate_limit_rate: float = 0.0  # 429 with Retry-After
+    retry_after_s: float = 1.0
+    slow_rate: float = 0.0        # responses delayed by slow_latency_s (to trip client timeouts / hedging)
+    slow_latency_s: float = 0.0
+    fail_first: int = 0           # the first N requests get a 503, whatever the rates
+    down_models: tuple = ()       # models that always answer 503
+    seed: int | None = None
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def decide(self, model: str) -> tuple[int, float]:
+        """(status, extra delay in seconds) for the next request."""
+        with self._lock:
+            self.requests += 1
+            if self.requests <= self.fail_first or model in self.down_models:
+                return 503, 0.0
+            r = self._rng.random()
+            if r < self.error_rate:
+                return self._rng.choice((500, 502, 503)), 0.0
+            if r < self.error_rate + self.rate_limit_rate:
+                return 429, 0.0
+            return 200, self.slow_latency_s if self._rng.random() < self.slow_rate else 0.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    timing = Timing()
+    faults: Faults | None = None
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404); return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        status, delay = self.faults.decide(request.get("model") or "") if self.faults else (200, 0.0)
+        first = self.timing.first_token() + delay
+        if status != 200:
+            if first:
+                time.sleep(first)
+            self.send_json(status, {"error": {"message": f"stub injected {status}", "type": "stub_fault", "code": None}},
+                           {"Retry-After": f"{self.faults.retry_after_s:g}"} if status == 429 else {})
+            return
+        if request.get("stream"):
+            if first:
+                time.sleep(first)
+            self.send_stream(stream_bodies(request, canned_review, self.timing.tokens_per_s))
+            return
+        body = completion_body(request)
+        wait = first + self.timing.generation_s(body["usage"]["completion_tokens"])
+        if wait:
+            time.sleep(wait)
+        self.send_json(200, body)
+
+    def send_stream(self, bodies):
+        """Server-sent events, one `data:` line per chunk, then [DONE] (the connection closes after it)."""
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            for chunk in paced(bodies):
+                self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_json(self, status: int, obj: dict, headers: dict | None = None):
+        body = json.dumps(obj).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (timeout or a hedged request that lost)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_server(port: int = 0, latency_s: float = 0.0, faults: Faults | None = None,
+                timing: Timing | None = None) -> ThreadingHTTPServer:
+    """`latency_s` is a fixed time to first token, for when no `timing` is given."""
+    handler = type("Handler", (StubHandler,), {"timing": timing or Timing(first_token_s=latency_s), "faults": faults})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 128  # many concurrent sessions connect at once in load tests
+    return server
+
+
+def serve_in_thread(port: int = 0, latency_s: float = 0.0, faults: Faults | None = None,
+                    timing: Timing | None = None) -> tuple[ThreadingHTTPServer, str]:
+    """Start the stub on a daemon thread; returns the server and its base URL (…/v1)."""
+    server = make_server(port, latency_s, faults, timing)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat-completions endpoint.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", "--first-token", type=float, default=0.0, dest="first_token",
+                    help="median seconds to the first token (the whole answer when not streamed and no --tokens-per-s)")
+    ap.add_argument("--dist", default="fixed", choices=("fixed", "uniform", "lognormal", "exponential"),
+                    help="distribution of the time to first token")
+    ap.add_argument("--spread", type=float, default=0.0, help="uniform: ± seconds; lognormal: sigma of log(seconds)")
+    ap.add_argument("--tokens-per-s", type=float, default=0.0, help="completion speed (0 = instant)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500/502/503")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+    ap.add_argument("--slow-rate", type=float, default=0.0, help="fraction of responses delayed by --slow-latency")
+    ap.add_argument("--slow-latency", type=float, default=0.0)
+    ap.add_argument("--fail-first", type=int, default=0, help="answer the first N requests with 503")
+    ap.add_argument("--down", action="append", default=[], help="model that always answers 503 (repeatable)")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args(argv)
+    faults = Faults(args.error_rate, args.rate_limit_rate, args.retry_after, args.slow_rate, args.slow_latency,
+                    args.fail_first, tuple(args.down), args.seed)
+    timing = Timing(args.first_token, args.dist, args.spread, args.tokens_per_s, args.seed)
+    server = make_server(args.port, faults=faults, timing=timing)
+    print(f"Stub OpenAI endpoint on http://127.0.0.1:{args.port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# coach/validate.py
+"""
+Structural check of a post-processed review against the response template: every major section that
+is not an empty block is present with all its subheadings, the standard subheadings carry at least
+DEPTH_MIN_COUNTS bullets, and the 13) / 14) subheadings are not empty.
+"""
+import re
+
+from coach.markdown import Line, Review, Section
+from coach.prompts import DEPTH_MIN_COUNTS
+from coach.sections import MAJOR_SECTIONS, subs_for
+
+ITEM_RE = re.compile(r"(?:\d+[.)]|\*)\s+\S")  # numbered or '*' items count like bullets
+
+
+def is_item(ln: Line) -> bool:
+    return ln.kind == "bullet" or (ln.kind == "text" and bool(ITEM_RE.match(ln.md)))
+
+
+def section_issues(sec: Section) -> list[str]:
+    """What a section is missing, in words the repair prompt can quote (empty when it passes)."""
+    issues = []
+    subs = {s.title: s for s in sec.subsections}
+    for name in subs_for(sec.title):
+        sub = subs.get(name)
+        if sub is None:
+            issues.append(f"the '{name}' subheading is missing")
+            continue
+        if name in DEPTH_MIN_COUNTS:
+            have, need = sum(1 for ln in sub.lines if is_item(ln)), DEPTH_MIN_COUNTS[name]
+            if have < need:
+                issues.append(f"'{name}' has {have} bullet(s) but needs at least {need}")
+        elif not any(ln.kind != "blank" for ln in sub.lines):
+            issues.append(f"'{name}' is empty")
+    return issues
+
+
+def section_deficit(sec: Section) -> int:
+    """
+    How far a section is from passing: bullets short of the minimums (a missing subheading counts its
+    whole minimum plus one) and other subheadings that are missing or empty. 0 when it passes.
+    """
+    subs = {s.title: s for s in sec.subsections}
+    total = 0
+    for name in subs_for(sec.title):
+        sub = subs.get(name)
+        if name in DEPTH_MIN_COUNTS:
+            have = sum(1 for ln in sub.lines if is_item(ln)) if sub is not None else 0
+            total += max(0, DEPTH_MIN_COUNTS[name] - have) + (sub is None)
+        elif sub is None or not any(ln.kind != "blank" for ln in sub.lines):
+            total += 1
+    return total
+
+
+def validate_review(review: Review, empty_blocks: list[str]) -> dict[str, list[str]]:
+    """Problems per major section, in template order; sections that pass (and empty blocks) are left out."""
+    problems = {}
+    for title in MAJOR_SECTIONS:
+        if title in empty_blocks:
+            continue
+        sec = review.section(title)
+        issues = ["the whole section is missing"] if sec is None else section_issues(sec)
+        if issues:
+            problems[title] = issues
+    return problems